@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Tuple
+
+
+CHECKPOINT_DIR = os.environ.get(
+    "AYO_CHECKPOINTS",
+    os.path.join(os.path.expanduser("~"), ".ayo", "checkpoints")
+)
+
+class Checkpoints:
+    """An append-only log of completed steps for one script.
+
+    Every completed step is appended as one JSON line, written with a single ``write``
+    and flushed to disk, so a crash or ``kill -9`` loses at most the step that was
+    running. Loading never imports code, and a torn or unreadable line is simply ignored
+    (that step runs again).
+
+    Args:
+        identity (str): What identifies the script, e.g. its absolute path.
+
+    Example:
+        .. code-block :: python
+
+            checkpoints = Checkpoints("/path/to/ayo-script.py")
+            checkpoints.append(0, "ask", "yes")
+            checkpoints.load() # -> {0: ("ask", "yes")}
+    """
+    __slots__ = (
+        "path",
+    )
+    path: str
+
+    def __init__(self, identity: str):
+        digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()
+        self.path = os.path.join(CHECKPOINT_DIR, digest + ".log")
+
+    def load(self) -> Dict[int, Tuple[str, Any]]:
+        """Loads completed steps as ``{index: (step name, value)}``."""
+        records = {}
+
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                    records[record['i']] = (record['s'], record['v'])
+                except (ValueError, KeyError, TypeError):
+                    continue # torn write, or written by an older ayo
+
+        return records
+
+    def append(self, index: int, name: str, value: Any) -> None:
+        """Appends a completed step.
+
+        Values that don't survive a JSON round-trip unchanged (tuples, sets, non-str keys,
+        custom objects, ...) are not recorded, so a resume starts again from that step.
+
+        Args:
+            index (int): The step index.
+            name (str): The step name.
+            value (Any): The value the step returned.
+        """
+        try:
+            line = json.dumps({"i": index, "s": name, "v": value}, separators=(",", ":"))
+
+            if json.loads(line)['v'] != value:
+                return
+        except (TypeError, ValueError):
+            return
+
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+        try:
+            os.write(fd, (line + "\n").encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def clear(self) -> None:
+        """Removes every checkpoint of this script."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def clean_checkpoints() -> None:
+    """Removes the checkpoints of every script."""
+    shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
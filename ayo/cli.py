@@ -1,20 +1,46 @@
 import json
 import os
 import re
-import requests
 import shutil
 import sys
-from contextlib import suppress
-from typing import Dict, List, Optional, Tuple, Union
-
-from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn
-
+import threading
+import time
+from contextlib import nullcontext, suppress
+from typing import TYPE_CHECKING, ContextManager, Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from .download import (
+    API_URL,
+    DEFAULT_JOBS,
+    DEFAULT_MIRROR_PORT,
+    DEFAULT_MIRROR_TTL,
+    RAW_URL,
+    archive_url,
+    download_files,
+    extract_archive,
+    get_session,
+    set_offline
+)
+from . import store
+from .checkpoint import clean_checkpoints
+from .lock import load_lock, lock_key, lock_script, locked_config, unlock_script, verify_locked
+from .memo import Memo
+from .pack import EXTENSION as PACK_EXTENSION, write_pack
+from .runner import (
+    DEFAULT_EXEC_MODE,
+    DEFAULT_SCRIPT_JOBS,
+    plan_before_scripts,
+    run_before_scripts,
+    run_bin
+)
 from .template import Template
-from .utils import tof, random_fact
+from .utils import SELF_REMOVE_ENV, LazyConsole, bytes_to_readable, tof, random_fact
+
+if TYPE_CHECKING:
+    from rich.progress import Progress
 
 
-console = Console()
+console = LazyConsole()
 POSSIBLE_TYPES = Union[str, bool, int]
 
 def infer_value(plain_text: str) -> POSSIBLE_TYPES:
@@ -95,6 +121,38 @@ def show_help(target_command: Optional[str] = None) -> int:
                     "name": "install-only",
                     "help": "Install and not run it?",
                     "example": "@owner/repo --install-only"
+                },
+                {
+                    "name": "jobs",
+                    "help": f"The maximum amount of concurrent downloads. Defaults to {DEFAULT_JOBS}.",
+                    "example": "@owner/repo --jobs=16"
+                },
+                {
+                    "name": "archive",
+                    "help": "Fetch the repository snapshot as one archive instead of file by file.",
+                    "example": "@owner/repo --archive"
+                },
+                {
+                    "name": "exec",
+                    "help": "How to run scripts: subprocess (default), inprocess or fork.",
+                    "example": "@owner/repo --exec=fork"
+                },
+                {
+                    "name": "script-jobs",
+                    "help": "The maximum amount of before-scripts running at once. "
+                            f"Defaults to {DEFAULT_SCRIPT_JOBS}.",
+                    "example": "@owner/repo --script-jobs=2"
+                },
+                {
+                    "name": "locked",
+                    "help": "Install exactly what ayo.lock records (everything in it if no scripts are given), "
+                            "from the store only, without any network access.",
+                    "example": "--locked"
+                },
+                {
+                    "name": "offline",
+                    "help": "Only use scripts already installed or in the store; never touch the network.",
+                    "example": "@owner/repo --offline"
                 }
             ],
         },
@@ -109,7 +167,19 @@ def show_help(target_command: Optional[str] = None) -> int:
                     "example": "."
                 }
             ],
-            "kwargs": []
+            "kwargs": [
+                {
+                    "name": "exec",
+                    "help": "How to run scripts: subprocess (default), inprocess or fork.",
+                    "example": ". --exec=fork"
+                },
+                {
+                    "name": "script-jobs",
+                    "help": "The maximum amount of before-scripts running at once. "
+                            f"Defaults to {DEFAULT_SCRIPT_JOBS}.",
+                    "example": ". --script-jobs=2"
+                }
+            ]
         },
         {
             "name": "update",
@@ -121,7 +191,18 @@ def show_help(target_command: Optional[str] = None) -> int:
                     "example": "@owner/repo, @owner/repo\[branch], ..."
                 }
             ],
-            "kwargs": []
+            "kwargs": [
+                {
+                    "name": "jobs",
+                    "help": f"The maximum amount of concurrent downloads. Defaults to {DEFAULT_JOBS}.",
+                    "example": "@owner/repo --jobs=16"
+                },
+                {
+                    "name": "archive",
+                    "help": "Fetch the repository snapshot as one archive instead of file by file.",
+                    "example": "@owner/repo --archive"
+                }
+            ]
         },
         {
             "name": "uninstall",
@@ -134,14 +215,66 @@ def show_help(target_command: Optional[str] = None) -> int:
                     "example": "@owner/repo, @owner/repo\[branch], ..."
                 }
             ],
-            "kwargs": []
+            "kwargs": [
+                {
+                    "name": "purge",
+                    "help": "Also forget the script in the global store.",
+                    "example": "@owner/repo --purge"
+                }
+            ]
         },
         {
             "name": "clean-cache",
-            "help": "Cleans cache files.",
+            "help": "Cleans cache files (step checkpoints and memoized step results).",
             "args": [],
+            "kwargs": [
+                {
+                    "name": "list",
+                    "help": "List memoized step results instead of removing anything.",
+                    "example": "--list"
+                }
+            ]
+        },
+        {
+            "name": "pack",
+            "help": "Packs templates into single .ayopack files.",
+            "args": [
+                {
+                    "name": "templates",
+                    "help": "The templates (under .ayo-templates) to pack.",
+                    "example": "my-template, ..."
+                }
+            ],
             "kwargs": []
         },
+        {
+            "name": "serve",
+            "help": "Runs a caching mirror of GitHub for other machines to install from "
+                    "(point them at it with AYO_MIRROR).",
+            "args": [],
+            "kwargs": [
+                {
+                    "name": "host",
+                    "help": "The host to bind. Defaults to 127.0.0.1.",
+                    "example": "--host=0.0.0.0"
+                },
+                {
+                    "name": "port",
+                    "help": f"The port to bind. Defaults to {DEFAULT_MIRROR_PORT}.",
+                    "example": "--port=8080"
+                },
+                {
+                    "name": "upstream",
+                    "help": "Another mirror to fetch from, instead of GitHub.",
+                    "example": "--upstream=http://10.0.0.2:8087"
+                },
+                {
+                    "name": "ttl",
+                    "help": f"How long a resolved branch is trusted, in seconds. Defaults to {DEFAULT_MIRROR_TTL}.",
+                    "example": "--ttl=300"
+                }
+            ]
+        },
         {
             "name": "new",
             "aliases": ["init"],
@@ -234,140 +367,543 @@ def show_help(target_command: Optional[str] = None) -> int:
 """)
     return 0
 
-def gh_get_ayo_config(owner: str, name: str, branch: str) -> Tuple[str, dict]:
-    """Gets the ``ayo.config.json`` from a GitHub repository."""
-    base_url = f"https://raw.githubusercontent.com/{owner}/{name}/{branch}"
+def use_progress(progress: Optional["Progress"] = None) -> ContextManager["Progress"]:
+    """Uses a shared progress display if given, or creates a new one.
+
+    Args:
+        progress (rich.progress.Progress, optional): The shared progress display.
+    """
+    if progress is not None:
+        return nullcontext(progress)
+
+    from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn
+
+    return Progress(
+        SpinnerColumn(),
+        *Progress.get_default_columns(),
+        TimeElapsedColumn(),
+        console=console.load()
+    )
+
+def gh_fetch_ayo_config(owner: str, name: str, ref: str) -> Optional[dict]:
+    """GitHub: Fetches the ``ayo.config.json`` of a repository, without any output.
+
+    Returns ``None`` if it doesn't exist.
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        ref (str): The branch, or a commit hash.
+    """
+    r = get_session().get(
+        f"{RAW_URL}/{owner}/{name}/{ref}/ayo.config.json"
+    )
+
+    if r.status_code != 200:
+        return None
+
+    return r.json()
+
+def gh_get_ayo_config(
+    owner: str,
+    name: str,
+    branch: str,
+    ref: Optional[str] = None
+) -> Tuple[str, dict]:
+    """Gets the ``ayo.config.json`` from a GitHub repository.
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+        ref (str, optional): The commit to read the config at. Defaults to the branch head.
+    """
+    base_url = f"{RAW_URL}/{owner}/{name}/{branch}"
     
     with console.status(
         f"⚙️  [green]getting config for[/green] "
         f"[blue]{name!r}[/blue] owned by [blue]@{owner}[/blue] "
         f"[d](branch {branch!r})[/d]"
     ):
-        
-        r = requests.get(
-            f"{base_url}/ayo.config.json"
-        )
-        if r.status_code != 200:
+        config = gh_fetch_ayo_config(owner, name, ref or branch)
+
+        if config is None:
             console.print(
                 f"[red]failed to get @{owner}/{name}[/red] - ayo.config.json doesn't exist"
             )
             exit(1)
         
-        config = r.json()
         console.print(config, "\n[blue]Got config![/blue]")
 
     return base_url, config
 
-def gh_download_script_from_config(base_url: str, config: dict) -> str:
-    """GitHub: Download a script from a config dictionary.
-    
+def gh_get_tree(owner: str, name: str, ref: str) -> Optional[Dict[str, str]]:
+    """GitHub: Gets every file path and blob hash of a branch (or commit) in a single request.
+
+    Returns ``None`` if the tree cannot be listed (or was truncated by GitHub).
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        ref (str): The branch, or a commit hash.
+    """
+    r = get_session().get(
+        f"{API_URL}/repos/{owner}/{name}/git/trees/{quote(ref)}?recursive=1"
+    )
+
+    if r.status_code != 200:
+        return None
+
+    data = r.json()
+    if data.get("truncated"):
+        return None
+
+    return {
+        item['path']: item['sha']
+        for item in data['tree']
+        if item['type'] == "blob"
+    }
+
+def gh_get_revision(
+    owner: str,
+    name: str,
+    branch: str,
+    known: Optional[dict] = None
+) -> Optional[dict]:
+    """GitHub: Resolves the commit a branch points to.
+
+    Returns ``{"commit": sha, "etag": etag}``, or ``None`` if it cannot be resolved.
+    With a ``known`` revision the request is conditional, so an unchanged branch costs
+    a ``304`` and nothing else.
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+        known (dict, optional): The previously resolved revision.
+    """
+    headers = {"Accept": "application/vnd.github.sha"}
+
+    if known and known.get("etag"):
+        headers["If-None-Match"] = known["etag"]
+
+    r = get_session().get(
+        f"{API_URL}/repos/{owner}/{name}/commits/{quote(branch)}",
+        headers=headers
+    )
+
+    if r.status_code == 304:
+        return {"commit": known["commit"], "etag": known["etag"]}
+
+    if r.status_code != 200:
+        return None
+
+    return {"commit": r.text.strip(), "etag": r.headers.get("ETag")}
+
+def install_from_store(
+    owner: str,
+    name: str,
+    branch: str,
+    config: dict,
+    files: Dict[str, str]
+) -> str:
+    """Records a script in the global store and links it into ``.ayo-scripts``.
+
+    Only files that differ from what this project has installed (its own manifest, not
+    the store's, which other projects update too) are rewritten, and files that are gone
+    upstream are removed.
+
     Args:
-        base_url (str): The base URL. Should start with ``https://raw.githubusercontent.com/``.
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
         config (dict): The config dictionary.
+        files (dict of str: str): Relative paths mapped to blob hashes (already in the store).
     """
-    files = [config['bin'], *config.get('with', [])]
+    key = f"{owner}~{name}~{branch}"
+    full_path = f".ayo-scripts/{key}/"
 
     if not os.path.exists(".ayo-scripts"):
-        os.mkdir(".ayo-scripts")
+        os.makedirs(".ayo-scripts", exist_ok=True)
         console.print("[d white]created .ayo-scripts[/d white]")
 
-    repo_name = base_url[
-        len("https://raw.githubusercontent.com/"):
-    ]
-    full_path = ".ayo-scripts/" + repo_name.replace("/", "~") + "/"
+    files["ayo.config.json"] = store.add_blob(bytes(
+        json.dumps(config, indent=4),
+        encoding="utf-8"
+    ))
+
+    previous = store.load_installed(full_path)
+    old_files: Dict[str, str] = previous['files'] if previous else {}
+
+    for path in old_files.keys() - files.keys():
+        with suppress(FileNotFoundError):
+            os.remove(full_path + path)
 
-    if not os.path.exists(full_path):
-        os.mkdir(full_path)
+    changed = {
+        path: sha
+        for path, sha in files.items()
+        if old_files.get(path) != sha or not os.path.lexists(full_path + path)
+    }
+    store.materialize(changed, full_path)
+    store.save_manifest(key, {"config": config, "files": files})
+    store.save_installed(full_path, {"config": config, "files": files})
+
+    if old_files:
         console.print(
-            f"[d white]created {full_path}[/d white]"
+            f"\nupdated [green]{full_path}[/green] "
+            f"[d white]({len(changed)} changed, "
+            f"{len(old_files.keys() - files.keys())} removed)[/d white]"
         )
+    else:
+        console.print(f"\ncollected and created [green]{full_path}[/green]")
 
-    with Progress(
-        SpinnerColumn(),
-        *Progress.get_default_columns(),
-        TimeElapsedColumn(),
-    ) as progress:
+    if any(path.startswith(".ayo-templates/") for path in files):
+        console.print("[green]successfully[/green] installed all templates")
+
+    return full_path
+
+def gh_download_script_from_config(
+    base_url: str,
+    config: dict,
+    *,
+    ref: Optional[str] = None,
+    jobs: int = DEFAULT_JOBS,
+    progress: Optional["Progress"] = None,
+    limit: Optional[threading.Semaphore] = None
+) -> str:
+    """GitHub: Download a script from a config dictionary.
+
+    Blobs already in the global store are never fetched again.
+    
+    Args:
+        base_url (str): The base URL. Should start with ``RAW_URL`` (``https://raw.githubusercontent.com/``
+            unless ``AYO_MIRROR`` is set).
+        config (dict): The config dictionary.
+        ref (str, optional): The commit to fetch the files at, so that they all come from
+            the same revision. Defaults to the branch of ``base_url``.
+        jobs (int, optional): The maximum amount of concurrent downloads.
+        progress (rich.progress.Progress, optional): A progress display shared with other
+            downloads. One is created if not given.
+        limit (threading.Semaphore, optional): A cap on requests shared with other downloads.
+    """
+    owner, name, branch = base_url[
+        len(RAW_URL + "/"):
+    ].split("/", 2)
+    source_url = f"{RAW_URL}/{owner}/{name}/{ref}" if ref else base_url
+    label = f"[d white]@{owner}/{name}[/d white] " if progress else ""
+
+    with limit or nullcontext(), nullcontext() if progress else console.status(
+        "[blue]listing files...[/blue]\n"
+        "  Did you know: " + random_fact()
+    ):
+        tree = gh_get_tree(owner, name, ref or branch)
+
+    wanted = [config['bin'], *config.get('with', [])]
+
+    if tree is None:
+        console.print(
+            f"{label}[blue]no templates found[/blue] [d white](cannot list repository)[/d white]"
+        )
+        tree = {}
+    else:
+        wanted.extend(path for path in tree if path.startswith(".ayo-templates/"))
+
+    files = {}
+    missing = {}
+
+    for path in wanted:
+        sha = tree.get(path)
+
+        if sha and store.has_blob(sha, verify=True):
+            files[path] = sha
+        else:
+            missing[store.temp_path()] = path
+
+    with use_progress(progress) as progress:
         task = progress.add_task(
-            "[blue]Fetching required contents...",
-            total=len(config.get("with", [])) + 2 # with + bin (main) + config
+            f"[blue]@{owner}/{name}" if label else "[blue]Fetching required contents...",
+            total=len(missing)
         )
 
-        for file in files:
-            r = requests.get(base_url + f"/{file}")
+        if files:
+            progress.log(f"{label}[d white]reusing {len(files)} file(s) from the store[/d white]")
 
-            if r.status_code != 200:
-                progress.log(f"[red]failed to get {file!r}[/red] (exit status 1)")
+        for _, tmp, status, sha in download_files(
+            [
+                (source_url + f"/{quote(path)}", tmp)
+                for tmp, path in missing.items()
+            ],
+            jobs=jobs,
+            limit=limit,
+            hasher=store.blob_hasher
+        ):
+            file = missing[tmp]
+
+            if status != 200:
+                progress.log(f"{label}[red]failed to get {file!r}[/red] (exit status 1)")
                 exit(1)
 
-            with open(full_path + file, "wb") as lf:
-                lf.write(r.content)
+            try:
+                files[file] = store.add_blob_file(tmp, tree.get(file), sha=sha)
+            except ValueError:
+                progress.log(f"{label}[red]corrupted download: {file!r}[/red] (exit status 1)")
+                exit(1)
 
-            progress.log(f"collected {file!r}")
+            progress.log(f"{label}collected {file!r}")
             progress.update(task, advance=1)
 
-        progress.log("injecting config...")
-    
-        with open(full_path + "ayo.config.json", "wb") as file:
-            file.write(bytes(
-                json.dumps(config, indent=4),
-                encoding="utf-8"
-            ))
+    return install_from_store(owner, name, branch, config, files)
 
-        progress.update(task, advance=1)
-    
-    console.print(f"\ncollected and created [green]{full_path}[/green]")
+def gh_download_script_from_archive(
+    owner: str,
+    name: str,
+    branch: str,
+    config: dict,
+    *,
+    ref: Optional[str] = None,
+    progress: Optional["Progress"] = None,
+    limit: Optional[threading.Semaphore] = None
+) -> str:
+    """GitHub: Download a script from a single repository snapshot.
+
+    Only ``bin``, the ``with`` files and ``.ayo-templates/**`` are extracted.
     
-    installed_templates = False
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+        config (dict): The config dictionary.
+        ref (str, optional): The commit to take the snapshot of. Defaults to the branch head.
+        progress (rich.progress.Progress, optional): A progress display shared with other
+            downloads. One is created if not given.
+        limit (threading.Semaphore, optional): A cap on requests shared with other downloads.
+    """
+    required = {config['bin'], *config.get('with', [])}
+    staging = store.temp_path()
+    files = {}
 
-    with console.status(
-        "[blue]collecting templates...[/blue] "
-        "[d white](.ayo-templates/*)[/d white]\n"
-        "  Did you know: " + random_fact()
-    ):
-        r = requests.get(
-            f"https://api.github.com/repos/{'/'.join(repo_name.split('/')[:-1])}/contents/.ayo-templates"
+    def wanted(path: str) -> bool:
+        return path in required \
+            or path == ".ayo-templates" \
+            or path.startswith(".ayo-templates/")
+
+    label = f"[d white]@{owner}/{name}[/d white] " if progress else ""
+
+    with use_progress(progress) as progress:
+        task = progress.add_task(
+            f"[blue]@{owner}/{name}" if label else "[blue]Extracting repository snapshot...",
+            total=None
         )
 
-        if r.status_code != 200:
-            console.print(f"[blue]no templates found[/blue]")
-        
-        else:
-            for item in r.json():
-                if item['type'] != "dir":
-                    continue
+        try:
+            with limit or nullcontext():
+                for path in extract_archive(archive_url(owner, name, ref or branch), staging, wanted):
+                    files[path] = store.add_blob_file(os.path.join(staging, path))
+                    progress.log(f"{label}collected {path!r}")
+                    progress.update(task, advance=1)
 
-                template_path = full_path + ".ayo-templates/"
-                os.mkdir(template_path)
-                os.mkdir(template_path + "/".join(item['path'].split('/')[1:]))
-                gh_download_template_item(template_path, item['url'])
-                installed_templates = True
+        except ConnectionError as err:
+            progress.log(f"{label}[red]{err}[/red] (exit status 1)")
+            exit(1)
 
-    if installed_templates:
-        console.print("[green]successfully[/green] installed all templates")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
 
-    return full_path
+        if not required.issubset(files):
+            progress.log(
+                f"{label}[red]failed to get {sorted(required - set(files))[0]!r}[/red] (exit status 1)"
+            )
+            exit(1)
 
-def gh_download_template_item(template_path: str, url: str):
-    r = requests.get(url)
+        progress.update(task, total=len(files))
 
-    if r.status_code != 200:
-        console.print(f"[red]cannot get a template[/red]")
-        return
+    return install_from_store(owner, name, branch, config, files)
+
+def download_script(
+    owner: str,
+    name: str,
+    branch: str,
+    kwargs: Dict[str, POSSIBLE_TYPES],
+    *,
+    revision: Optional[dict] = None,
+    progress: Optional["Progress"] = None,
+    limit: Optional[threading.Semaphore] = None
+) -> str:
+    """Downloads a script from GitHub with the fetch mode chosen by the user.
     
-    for item in r.json():
-        if item['type'] == "dir":
-            os.mkdir(template_path + "/".join(item['path'].split('/')[1:]))
-            gh_download_template_item(template_path, item['url'])
-        
-        else:
-            file_r = requests.get(item['download_url'])
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+        kwargs (dict of str: str | bool | int): The keyword-only args.
+        revision (dict, optional): The already resolved revision of the branch.
+        progress (rich.progress.Progress, optional): A progress display shared with other
+            downloads. Without it, each stage shows its own.
+        limit (threading.Semaphore, optional): A cap on requests shared with other downloads.
+    """
+    # once the branch is resolved, everything is fetched at that commit, so that a push
+    # in the middle of a download can't mix files from two revisions
+    if progress is None:
+        revision = revision or gh_get_revision(owner, name, branch)
+        ref = revision['commit'] if revision else None
+        base_url, config = gh_get_ayo_config(owner, name, branch, ref)
+
+    else:
+        with limit or nullcontext():
+            revision = revision or gh_get_revision(owner, name, branch)
+            ref = revision['commit'] if revision else None
+            config = gh_fetch_ayo_config(owner, name, ref or branch)
+
+        if config is None:
+            progress.log(
+                f"[red]failed to get @{owner}/{name}[/red] - ayo.config.json doesn't exist"
+            )
+            exit(1)
+
+        base_url = f"{RAW_URL}/{owner}/{name}/{branch}"
+
+    if kwargs.get("archive", False):
+        path = gh_download_script_from_archive(
+            owner,
+            name,
+            branch,
+            config,
+            ref=ref,
+            progress=progress,
+            limit=limit
+        )
+    else:
+        path = gh_download_script_from_config(
+            base_url,
+            config,
+            ref=ref,
+            jobs=kwargs.get("jobs", DEFAULT_JOBS),
+            progress=progress,
+            limit=limit
+        )
+
+    if revision:
+        key = f"{owner}~{name}~{branch}"
+        manifest = store.load_manifest(key)
+        manifest.update(revision)
+        store.save_manifest(key, manifest)
+
+        installed = store.load_installed(path)
+        installed.update(revision)
+        store.save_installed(path, installed)
+
+    return path
 
-            if file_r.status_code != 200:
-                console.print(f"[red]cannot get a template file[/red]")
+def fetch_scripts(
+    targets: List[Tuple[str, str, str]],
+    kwargs: Dict[str, POSSIBLE_TYPES]
+) -> List[str]:
+    """Downloads several scripts at once, with one combined progress display.
+
+    Revisions, configs, file lists and files of every script are fetched concurrently,
+    with ``--jobs`` capping the requests in flight across all of them, so the whole
+    thing takes about as long as the slowest script. Returns the paths in the order of
+    ``targets``.
+
+    Args:
+        targets (list of (str, str, str)): The ``(owner, name, branch)`` of each script.
+        kwargs (dict of str: str | bool | int): The keyword-only args.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    jobs = max(1, int(kwargs.get("jobs", DEFAULT_JOBS)))
+    limit = threading.BoundedSemaphore(jobs)
+
+    with use_progress() as progress:
+        executor = ThreadPoolExecutor(max_workers=min(jobs, len(targets)))
+
+        try:
+            futures = [
+                executor.submit(
+                    download_script,
+                    *target,
+                    kwargs,
+                    progress=progress,
+                    limit=limit
+                )
+                for target in targets
+            ]
+            return [future.result() for future in futures]
+
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def resolve_script(owner: str, name: str, branch: str) -> Optional[str]:
+    """Resolves an installed script to its ``.ayo-scripts`` path.
+
+    If this directory doesn't have it yet but the global store does, it's linked in
+    without touching the network. Returns ``None`` if the script is not installed.
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+    """
+    key = f"{owner}~{name}~{branch}"
+    inferred_path = f".ayo-scripts/{key}/"
+
+    if os.path.exists(inferred_path):
+        return inferred_path
+
+    manifest = store.load_manifest(key)
+
+    if manifest and store.materialize(manifest['files'], inferred_path):
+        store.save_installed(inferred_path, manifest)
+        console.print(f"[d white]linked {inferred_path} from the store[/d white]")
+        return inferred_path
+
+    return None
+
+def install_locked(owner: str, name: str, branch: str, entry: dict) -> Optional[str]:
+    """Installs a script exactly as recorded in ``ayo.lock``, from the global store only.
+
+    Never touches the network. Returns ``None`` if the store doesn't have every locked
+    file (unmodified).
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+        entry (dict): The lock entry.
+    """
+    repo = lock_key(owner, name, branch).replace("[", "\\[")
+    problems = verify_locked(entry)
+    config = locked_config(entry) if not problems else None
+
+    if config is None:
+        console.print(
+            f"[red]cannot install {repo} from ayo.lock:[/red] "
+            f"{len(problems) or 1} file(s) missing from (or modified in) the store "
+            f"[d white]({(problems or ['ayo.config.json'])[0]!r})[/d white]"
+        )
+        console.print(
+            "  [d white]pro tip: "
+            f"run [b blue]ayo i {repo}[/b blue] without --locked once to fill the store[/d white]"
+        )
+        return None
+
+    key = f"{owner}~{name}~{branch}"
+    previous = store.load_manifest(key) or {}
+    path = install_from_store(owner, name, branch, config, dict(entry['files']))
+    revision = {
+        "commit": entry.get('commit'),
+        "etag": previous.get('etag') if previous.get('commit') == entry.get('commit') else None
+    }
 
-            with open(template_path + "/".join(item['path'].split('/')[1:]), "wb") as f:
-                f.write(file_r.content)
+    manifest = store.load_manifest(key)
+    manifest.update(revision)
+    store.save_manifest(key, manifest)
 
+    installed = store.load_installed(path)
+    installed.update(revision)
+    store.save_installed(path, installed)
+
+    return path
 
 def get_owner_name_branch(repo: str) -> Tuple[str, str, str]:
     """Gets the owner, repository name and branch from the repo name the user provided.
@@ -390,17 +926,60 @@ def install_and_run(
     args: List[POSSIBLE_TYPES],
     kwargs: Dict[str, POSSIBLE_TYPES]
 ) -> int:
-    """Installs the script and runs it."""
+    """Installs the scripts and runs them.
+
+    Scripts that need downloading are all fetched at once first (see
+    :func:`fetch_scripts`), then every script runs in the order given.
+
+    With ``--locked``, scripts are installed exactly as recorded in ``ayo.lock`` (all of
+    them if none are given) from the global store, without any network access.
+    ``--offline`` only uses what's already installed or in the store. Otherwise,
+    installed revisions are recorded in ``ayo.lock``.
+    """
+    locked = kwargs.get("locked", False)
+
+    if locked or kwargs.get("offline", False):
+        set_offline()
+
+    try:
+        lock = load_lock()
+    except ValueError as err:
+        console.print(f"[red]{err}[/red]")
+        return 1
+
+    if locked and not args:
+        if not lock:
+            console.print("[red]nothing to install: ayo.lock is missing or empty[/red]")
+            return 1
+
+        args = list(lock)
+        kwargs = {**kwargs, "install-only": True}
+
     if not args:
         show_help("install")
         return 0
 
+    plan: List[Tuple[str, Optional[Tuple[str, str, str]], Optional[str]]] = []
+    to_fetch: List[Tuple[str, str, str]] = []
+
     for repo in args:
         if repo.startswith("@"):
-            owner, name, branch = get_owner_name_branch(repo)
-            inferred_path = f".ayo-scripts/{owner}~{name}~{branch}"
+            target = get_owner_name_branch(repo)
+            path = None if locked else resolve_script(*target)
+
+            if locked:
+                entry = lock.get(lock_key(*target))
+
+                if entry is None:
+                    console.print(f"[red]{repo} is not in ayo.lock[/red]")
+                    return 1
+
+                path = install_locked(*target, entry)
 
-            if os.path.exists(inferred_path):
+                if not path:
+                    return 1
+
+            elif path:
                 console.print()
                 console.print(
                     f"    [green]already exists: {repo}[/green]; using cached\n"
@@ -408,14 +987,18 @@ def install_and_run(
                 console.print(
                     f"    [d white]pro tip: use [blue]ayo update {repo}[/blue] to update[/d white]\n"
                 )
-                path = inferred_path + "/"
             
-            else:
-                base_url, config = gh_get_ayo_config(owner, name, branch)
-                path = gh_download_script_from_config(base_url, config)
+            elif kwargs.get("offline", False):
+                console.print(
+                    f"[red]{repo} is not installed or in the store, and --offline was given[/red]"
+                )
+                return 1
+
+            elif target not in to_fetch:
+                to_fetch.append(target)
+
+            plan.append((repo, target, path))
 
-            if not kwargs.get("install-only", False):
-                run_script(path)
         else:
             if kwargs.get("install-only", False):
                 console.print(
@@ -425,16 +1008,50 @@ def install_and_run(
             if not os.path.exists(repo):
                 console.print(f"[red]directory does not exist: {repo}[/red]")
                 return 1
-            
-            return run_script(repo + ("" if repo.endswith(("/", "\\")) else "/"))
 
-def run_script(path: str):
+            plan.append((repo, None, repo + ("" if repo.endswith(("/", "\\")) else "/")))
+
+    if len(to_fetch) == 1:
+        fetched = {to_fetch[0]: download_script(*to_fetch[0], kwargs)}
+    elif to_fetch:
+        fetched = dict(zip(to_fetch, fetch_scripts(to_fetch, kwargs)))
+    else:
+        fetched = {}
+
+    result = 0
+
+    for repo, target, path in plan:
+        if target:
+            path = path or fetched[target]
+
+            if not locked:
+                lock_script(*target)
+
+            if kwargs.get("install-only", False):
+                continue
+
+        result = run_script(
+            path,
+            mode=kwargs.get("exec", DEFAULT_EXEC_MODE),
+            jobs=kwargs.get("script-jobs", DEFAULT_SCRIPT_JOBS)
+        ) or result
+
+    return result
+
+def run_script(
+    path: str,
+    *,
+    mode: str = DEFAULT_EXEC_MODE,
+    jobs: int = DEFAULT_SCRIPT_JOBS
+):
     """Runs the script from its path.
     
     Make sure it ends with a slash.
 
     Args:
         path (str): The path.
+        mode (str, optional): How to run ``bin``: ``subprocess``, ``inprocess`` or ``fork``.
+        jobs (int, optional): The maximum amount of ``before-scripts`` running at once.
     """
     with open(path + "ayo.config.json", "r") as file:
         config: dict = json.load(file)
@@ -447,40 +1064,79 @@ def run_script(path: str):
         return "[blue]" + pieces[0] + "[/blue] " + " ".join(pieces[1:])
 
     if before_scripts:
-        if isinstance(before_scripts, str):
-            console.print("  running scripts")
-            console.print(f"  > {colored(before_scripts)}\n")
-            os.system(before_scripts)
-        else:
-            for cmd in before_scripts:
-                console.print(f"  > {colored(cmd)}\n")
-                os.system(cmd)
-    
+        console.print("  running scripts")
+
+        try:
+            for node in plan_before_scripts(before_scripts):
+                needs = f" [d white](after {', '.join(node['needs'])})[/d white]" \
+                    if node['needs'] else ""
+                console.print(f"  > {colored(node['run'])}{needs}")
+
+            console.print()
+            results = run_before_scripts(before_scripts, jobs=jobs)
+
+        except ValueError as err:
+            console.print(f"[red]{err}[/red]")
+            return 1
+
+        except KeyboardInterrupt:
+            console.print("\n[red]keyboard interrupt[/red]")
+            return 1
+
+        console.print()
+        for result in results:
+            status = "[green]ok[/green]" if result['code'] == 0 else (
+                "[red]terminated[/red]" if result['code'] is None
+                else f"[red]exit {result['code']}[/red]"
+            )
+            console.print(
+                f"  {status} {result['name']} [d white]{result['duration']:.2f}s[/d white]"
+            )
+
+        failed = [result for result in results if result['code']]
+        if failed:
+            console.print(
+                f"\n[red]before-script {failed[0]['name']!r} failed, not running the script[/red]"
+            )
+            return 1
+
+        console.print()
+
     console.print(f"  > {colored(f'cd {path}')}")
+    cwd = os.getcwd()
     os.chdir(path)
 
     cd_back_cmd = "cd " + ("../" * path.count('/'))
 
-    cmd = "python " + config['bin'] + f' "{cd_back_cmd if path[:-1] != "." else "./"}"'
-    console.print(f"  > {colored(cmd)}")
+    argv = [cd_back_cmd[len("cd "):] if path[:-1] != "." else "./"]
+    cmd = "python " + config['bin'] + f' "{argv[0]}"'
+    console.print(f"  > {colored(cmd)} [d white]({mode})[/d white]")
     console.print()
 
+    # absolute, since the script runs in another directory
+    marker = os.path.abspath(store.temp_path())
+    os.environ[SELF_REMOVE_ENV] = marker
+
     try:
-        result: int = os.system(cmd)
+        result: int = run_bin(config['bin'], argv, mode=mode)
     except KeyboardInterrupt:
         console.print("\n[red]keyboard interrupt[/red]")
         result: int = -1
+    finally:
+        # absolute, since an in-process script may have changed directories itself
+        os.chdir(cwd)
+        del os.environ[SELF_REMOVE_ENV]
+
+    wants_removal = os.path.exists(marker)
+
+    if wants_removal:
+        os.remove(marker)
     
     if path[:-1] != ".":
         console.print()
         console.print(f"  > {colored(cd_back_cmd)}\n")
-        os.chdir(cd_back_cmd[len('cd '):])
-
-    if result == 0:
-        console.print("\n[green]run completed[/green]")
-        return 0
 
-    elif result == -77034:
+    if wants_removal:
         if ".ayo-scripts/" not in path:
             console.print(
                 "\n  🔴 This script would like to [red]self-remove[/red].\n"
@@ -498,6 +1154,10 @@ def run_script(path: str):
             remove_script(path)
         
         return 0
+
+    elif result == 0:
+        console.print("\n[green]run completed[/green]")
+        return 0
         
     else:
         console.print("\n[red]execution failed: [/red] non-zero")
@@ -539,20 +1199,47 @@ def update_scripts(
     args: List[POSSIBLE_TYPES],
     kwargs: Dict[str, POSSIBLE_TYPES]
 ) -> int:
-    """Updates scripts."""
+    """Updates scripts.
+
+    Every branch is revalidated concurrently first, against the revision this project
+    has installed; scripts whose commit hasn't moved are left alone, and the rest only
+    rewrite files that changed.
+    """
     if not args:
         show_help("update")
         return 0
 
-    for repo in args:
-        owner, name, branch = get_owner_name_branch(repo)
+    from concurrent.futures import ThreadPoolExecutor
+
+    targets = [get_owner_name_branch(repo) for repo in args]
+    manifests = [
+        store.load_installed(f".ayo-scripts/{owner}~{name}~{branch}/")
+        for owner, name, branch in targets
+    ]
+
+    with console.status("[blue]checking for updates...[/blue]"):
+        with ThreadPoolExecutor(max_workers=max(1, int(kwargs.get("jobs", DEFAULT_JOBS)))) as executor:
+            revisions = list(executor.map(
+                lambda item: gh_get_revision(*item[0], known=item[1]) if item[1] else None,
+                zip(targets, manifests)
+            ))
+
+    for repo, (owner, name, branch), manifest, revision in zip(
+        args, targets, manifests, revisions
+    ):
         inferred_path = f".ayo-scripts/{owner}~{name}~{branch}"
-        result = remove_script(inferred_path)
+
+        if manifest and revision and revision['commit'] == manifest.get('commit'):
+            lock_script(owner, name, branch)
+            console.print(f"[d white]{repo} is already up to date[/d white]")
+            continue
+
+        result = manifest is not None or remove_script(inferred_path)
         
         if result:
             console.print(f"updating [blue]{repo}[/blue]")
-            base_url, config = gh_get_ayo_config(owner, name, branch)
-            gh_download_script_from_config(base_url, config)
+            download_script(owner, name, branch, kwargs, revision=revision)
+            lock_script(owner, name, branch)
 
             console.print(f"updated {repo} successfully")
 
@@ -563,8 +1250,8 @@ def update_scripts(
             yn = console.input("[blue]?[/blue] Would you like to install it? [Yn] ")
 
             if tof(yn):
-                base_url, config = gh_get_ayo_config(owner, name, branch)
-                gh_download_script_from_config(base_url, config)
+                download_script(owner, name, branch, kwargs)
+                lock_script(owner, name, branch)
 
             return 0
 
@@ -582,16 +1269,24 @@ def uninstall_scripts(
             return 1
 
         owner, name, branch = get_owner_name_branch(repo)
-        inferred_path = f".ayo-scripts/{owner}~{name}~{branch}"
+        key = f"{owner}~{name}~{branch}"
+        inferred_path = f".ayo-scripts/{key}"
+        purge = kwargs.get("purge", False) and store.load_manifest(key) is not None
 
-        if os.path.exists(inferred_path):
+        if os.path.exists(inferred_path) or purge:
             yn = console.input("[red]are you sure?[/red] I have a family! [Yn] ")
 
             if not tof(yn):
                 return 1
 
             with console.status(f"[red]uninstalling {repo!r}...[/red]"):
-                shutil.rmtree(inferred_path)
+                if os.path.exists(inferred_path):
+                    shutil.rmtree(inferred_path)
+
+                if purge:
+                    os.remove(store.manifest_path(key))
+
+                unlock_script(owner, name, branch)
     
             console.print(f"[green]uninstalled {repo!r}[/green]")
         else:
@@ -610,29 +1305,139 @@ def raw_run(
             console.print(f"[red]error: ayo.config.json does not exist[/red]")
             return 1
 
-        return run_script("./")
+        return run_script(
+            "./",
+            mode=kwargs.get("exec", DEFAULT_EXEC_MODE),
+            jobs=kwargs.get("script-jobs", DEFAULT_SCRIPT_JOBS)
+        )
 
     for repo in args:
         if repo.startswith("@"):
             owner, name, branch = get_owner_name_branch(repo)
-            inferred_path = f".ayo-scripts/{owner}~{name}~{branch}"
+            path = resolve_script(owner, name, branch)
 
-            if not os.path.exists(inferred_path):
-                console.print(f"\n  [red]directory does not exist: {inferred_path}[/red]")
+            if not path:
+                console.print(
+                    f"\n  [red]directory does not exist: .ayo-scripts/{owner}~{name}~{branch}[/red]"
+                )
                 console.print(
                     "  [d white]pro tip: "
                     f"use [b blue]ayo i {repo}[/b blue] to install[/d white]\n"
                 )
                 return 1
             
-            run_script(inferred_path + "/")
+            run_script(
+                path,
+                mode=kwargs.get("exec", DEFAULT_EXEC_MODE),
+                jobs=kwargs.get("script-jobs", DEFAULT_SCRIPT_JOBS)
+            )
             continue
 
         if not os.path.exists(repo):
             console.print(f"[red]directory does not exist: {repo}[/red]")
             return 1
         
-        run_script(repo + ("" if repo.endswith(("/", "\\")) else "/"))
+        run_script(
+            repo + ("" if repo.endswith(("/", "\\")) else "/"),
+            mode=kwargs.get("exec", DEFAULT_EXEC_MODE),
+            jobs=kwargs.get("script-jobs", DEFAULT_SCRIPT_JOBS)
+        )
+
+def pack_templates(
+    args: List[POSSIBLE_TYPES],
+    kwargs: Dict[str, POSSIBLE_TYPES]
+) -> int:
+    """Packs templates into ``.ayo-templates/<name>.ayopack``."""
+    if not args:
+        show_help("pack")
+        return 0
+
+    for name in args:
+        try:
+            template = Template(name)
+        except NotADirectoryError as err:
+            console.print(f"[red]{err}[/red]")
+            return 1
+
+        output = f".ayo-templates/{name}{PACK_EXTENSION}"
+
+        if not os.path.isdir(f".ayo-templates/{name}"):
+            # the contents are read from the pack itself; nothing to pack
+            console.print(
+                f"[red]{name!r} is already packed ({output}); "
+                f"there is no template directory to pack.[/red]"
+            )
+            return 1
+
+        with console.status(f"[blue]packing {name!r}...[/blue]"):
+            size = write_pack(template.contents, output)
+
+        console.print(
+            f"packed [blue]{name!r}[/blue] into [green]{output}[/green] "
+            f"[d white]({len(template.contents)} entries, {bytes_to_readable(size)})[/d white]"
+        )
+
+    return 0
+
+def serve_mirror(
+    args: List[POSSIBLE_TYPES],
+    kwargs: Dict[str, POSSIBLE_TYPES]
+) -> int:
+    """Runs a caching mirror of GitHub until interrupted."""
+    from .mirror import make_server
+
+    server = make_server(
+        kwargs.get("host", "127.0.0.1"),
+        int(kwargs.get("port", DEFAULT_MIRROR_PORT)),
+        upstream=kwargs.get("upstream") or None,
+        ttl=float(kwargs.get("ttl", DEFAULT_MIRROR_TTL))
+    )
+    host, port = server.server_address[:2]
+
+    console.print(
+        f"serving a mirror on [green]http://{host}:{port}[/green] "
+        f"[d white](store: {store.STORE_DIR})[/d white]"
+    )
+    console.print(f"  [d white]use it with [b blue]AYO_MIRROR=http://{host}:{port}[/b blue][/d white]")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("\n[d white]stopped[/d white]")
+    finally:
+        server.server_close()
+
+    return 0
+
+def clean_cache(
+    args: List[POSSIBLE_TYPES],
+    kwargs: Dict[str, POSSIBLE_TYPES]
+) -> int:
+    """Cleans (or lists) cache files."""
+    memo = Memo()
+
+    if kwargs.get("list", False):
+        entries = memo.entries()
+
+        for info in entries:
+            age = time.time() - info['used']
+            console.print(
+                f"  [blue]{info['step']}[/blue] [d white]{info['key'][:12]}[/d white] "
+                f"{bytes_to_readable(info['size'])}, used {age / 3600:.1f}h ago"
+            )
+
+        console.print(
+            f"\n{len(entries)} memoized result(s), "
+            f"{bytes_to_readable(sum(info['size'] for info in entries))} in {memo.directory}"
+        )
+        return 0
+
+    with suppress(FileNotFoundError):
+        os.remove("_ayo$cache.py") # left over by older versions
+
+    clean_checkpoints()
+    memo.clear()
+    return 0
 
 def init_new_project(
     args: List[POSSIBLE_TYPES],
@@ -703,10 +1508,13 @@ def main():
             exit(raw_run(args[1:], kwargs))
 
         elif args[0].lower() == 'clean-cache':
-            with suppress(FileNotFoundError):
-                os.remove("_ayo$cache.py")
+            exit(clean_cache(args[1:], kwargs))
+
+        elif args[0].lower() == 'pack':
+            exit(pack_templates(args[1:], kwargs))
 
-            exit(0)
+        elif args[0].lower() == 'serve':
+            exit(serve_mirror(args[1:], kwargs))
 
         elif args[0].lower() in ['init', 'new']:
             exit(init_new_project(args[1:], kwargs))
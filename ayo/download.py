@@ -0,0 +1,306 @@
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+
+DEFAULT_JOBS = 8
+CHUNK_SIZE = 64 * 1024
+RETRIES = 4
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+TIMEOUT = (10, 60)
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+GITHUB_API_URL = "https://api.github.com"
+MIRROR = os.environ.get("AYO_MIRROR", "").rstrip("/")
+DEFAULT_MIRROR_PORT = 8087
+DEFAULT_MIRROR_TTL = 60
+RAW_URL = MIRROR + "/raw" if MIRROR else GITHUB_RAW_URL
+API_URL = MIRROR + "/api" if MIRROR else GITHUB_API_URL
+ARCHIVE_URL = os.environ.get(
+    "AYO_ARCHIVE_URL",
+    "https://codeload.github.com/{owner}/{name}/tar.gz/{branch}"
+)
+
+_offline = bool(os.environ.get("AYO_OFFLINE"))
+_session: Optional["requests.Session"] = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+def set_offline(offline: bool = True) -> None:
+    """Forbids (or allows again) any network access through :func:`get_session`.
+
+    Also enabled by setting ``AYO_OFFLINE``.
+
+    Args:
+        offline (bool, optional): Whether to forbid network access.
+    """
+    global _offline
+    _offline = offline
+
+def get_session(pool_size: int = DEFAULT_JOBS) -> "requests.Session":
+    """Gets the shared keep-alive session.
+
+    The connection pool grows to ``pool_size`` if it's smaller, so that every worker can
+    hold on to its own connection.
+
+    Args:
+        pool_size (int, optional): The minimum amount of pooled connections per host.
+
+    Raises:
+        ConnectionError: Network access is forbidden (see :func:`set_offline`).
+    """
+    global _session, _session_pool_size
+
+    if _offline:
+        raise ConnectionError("network access is disabled (offline mode)")
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+
+        if pool_size > _session_pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session_pool_size = pool_size
+
+    return _session
+
+def download_file(
+    url: str,
+    path: str,
+    *,
+    hasher: Optional[Callable[[int], Any]] = None,
+    retries: int = RETRIES
+) -> Tuple[int, Optional[str]]:
+    """Downloads a file in chunks, retrying and resuming where it left off.
+
+    The body is streamed to ``<path>.part``, which is renamed to ``path`` once complete,
+    so ``path`` never holds a partial file. Failed connections, timeouts, truncated bodies
+    and ``408``/``429``/``5xx`` responses are retried with exponential backoff (or
+    ``Retry-After``), and retries ask for the remaining bytes only with a ``Range`` request.
+
+    Returns ``(status_code, digest)``; the status is ``200`` once the file is complete, or
+    the last status seen (``0`` if the server couldn't be reached). ``digest`` is the hex
+    digest of ``hasher(size)`` fed with the body while streaming, or ``None`` without a
+    hasher or when the server doesn't tell the size up front.
+
+    Args:
+        url (str): The URL.
+        path (str): The output path.
+        hasher ((size: int) -> hash object, optional): Creates the hash to compute, like
+            :func:`ayo.store.blob_hasher`.
+        retries (int, optional): How many times to retry.
+    """
+    import requests
+
+    session = get_session()
+    part = path + ".part"
+    status = 0
+    digest = None
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    for attempt in range(retries + 1):
+        delay = min(BACKOFF * 2 ** attempt * random.uniform(0.5, 1.0), MAX_BACKOFF)
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Accept-Encoding": "identity"}
+
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+                status = r.status_code
+
+                if status in RETRY_STATUSES:
+                    retry_after = r.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = min(max(delay, int(retry_after)), MAX_BACKOFF)
+
+                    time.sleep(delay)
+                    continue
+
+                if status == 416 and offset:
+                    os.remove(part) # the partial file is no good; start over
+                    continue
+
+                if status not in (200, 206):
+                    break
+
+                total = None
+                encoded = r.headers.get("Content-Encoding", "identity") != "identity"
+
+                if status == 206:
+                    match = CONTENT_RANGE.match(r.headers.get("Content-Range", ""))
+
+                    if not match or int(match.group(1)) != offset:
+                        os.remove(part)
+                        continue
+
+                    if match.group(2) != "*":
+                        total = int(match.group(2))
+
+                else:
+                    offset = 0
+                    if r.headers.get("Content-Length", "").isdigit() and not encoded:
+                        total = int(r.headers['Content-Length'])
+
+                sha = hasher(total) if hasher and total is not None else None
+
+                if sha and offset:
+                    with open(part, "rb") as file:
+                        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                            sha.update(chunk)
+
+                received = offset
+
+                with open(part, "ab" if offset else "wb") as file:
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        file.write(chunk)
+                        received += len(chunk)
+
+                        if sha:
+                            sha.update(chunk)
+
+                if total is not None and received < total:
+                    status = 0
+                    time.sleep(delay)
+                    continue # truncated; resume
+
+                digest = sha.hexdigest() if sha else None
+                os.replace(part, path)
+                return 200, digest
+
+        except requests.RequestException:
+            status = 0
+            time.sleep(delay)
+
+    if os.path.exists(part):
+        os.remove(part)
+
+    return status, None
+
+def download_files(
+    items: Iterable[Tuple[str, str]],
+    *,
+    jobs: int = DEFAULT_JOBS,
+    limit: Optional[threading.Semaphore] = None,
+    hasher: Optional[Callable[[int], Any]] = None
+) -> Iterator[Tuple[str, str, int, Optional[str]]]:
+    """Downloads files concurrently with :func:`download_file`.
+
+    Yields ``(url, path, status_code, digest)`` in completion order. Files that could not
+    be downloaded completely are not written.
+
+    Args:
+        items (iterable of (str, str)): Pairs of ``(url, path)``.
+        jobs (int, optional): The maximum amount of concurrent downloads.
+        limit (threading.Semaphore, optional): A cap shared with other downloads running at
+            the same time; each download holds it while in flight.
+        hasher ((size: int) -> hash object, optional): Creates the hash to compute while streaming.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    jobs = max(1, int(jobs))
+    get_session(jobs)
+
+    def fetch(url: str, path: str) -> Tuple[str, str, int, Optional[str]]:
+        with limit or nullcontext():
+            status, digest = download_file(url, path, hasher=hasher)
+
+        return url, path, status, digest
+
+    executor = ThreadPoolExecutor(max_workers=jobs)
+
+    try:
+        futures = [executor.submit(fetch, url, path) for url, path in items]
+
+        for future in as_completed(futures):
+            yield future.result()
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def archive_url(owner: str, name: str, branch: str) -> str:
+    """Gets the ``.tar.gz`` snapshot URL of a repository. ``branch`` may also be a commit hash.
+
+    Set ``AYO_ARCHIVE_URL`` (a format string with ``{owner}``, ``{name}`` and ``{branch}``)
+    to fetch snapshots from somewhere else.
+    """
+    return ARCHIVE_URL.format(owner=owner, name=name, branch=branch)
+
+def extract_archive(
+    url: str,
+    dest: str,
+    wanted: Callable[[str], bool]
+) -> Iterator[str]:
+    """Downloads a ``.tar.gz`` repository snapshot and extracts the wanted members.
+
+    The archive is downloaded with :func:`download_file` (so it's retried and resumed)
+    next to ``dest``, then read member by member, so it's never held in memory as a
+    whole. The top-level directory GitHub wraps snapshots in is stripped. Yields each
+    extracted path relative to ``dest``.
+
+    Args:
+        url (str): The archive URL.
+        dest (str): The directory to extract into.
+        wanted ((path: str) -> bool): Whether to extract a member, given its relative path.
+
+    Raises:
+        ConnectionError: The archive could not be fetched, or is corrupted.
+    """
+    import gzip
+    import tarfile
+
+    path = dest.rstrip("/\\") + ".tar.gz"
+    status, _ = download_file(url, path)
+
+    if status != 200:
+        raise ConnectionError(f"failed to get archive {url!r} (status {status})")
+
+    try:
+        with tarfile.open(path, mode="r|gz") as archive:
+            for member in archive:
+                pieces = member.name.split("/", 1)
+                if len(pieces) < 2 or not pieces[1]:
+                    continue
+
+                relpath = os.path.normpath(pieces[1]).replace("\\", "/")
+                if os.path.isabs(relpath) or relpath.split("/")[0] == "..":
+                    continue
+
+                if not wanted(relpath):
+                    continue
+
+                target = os.path.join(dest, relpath)
+
+                if member.isdir():
+                    os.makedirs(target, exist_ok=True)
+
+                elif member.isfile():
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    source = archive.extractfile(member)
+
+                    with open(target, "wb") as file:
+                        shutil.copyfileobj(source, file, CHUNK_SIZE)
+
+                    yield relpath
+
+    except (tarfile.TarError, EOFError, gzip.BadGzipFile) as err:
+        raise ConnectionError(f"failed to extract archive {url!r} ({err})") from err
+
+    finally:
+        os.remove(path)
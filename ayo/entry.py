@@ -0,0 +1,157 @@
+import os
+import shutil
+import sys
+from typing import Any, BinaryIO, Optional, Tuple
+
+
+# entry kinds
+DIRECTORY = 0
+DATA = 1 # bytes held in memory
+SOURCE = 2 # a file on disk
+PACK = 3 # a slice of a memory-mapped pack
+LAZY = 4 # produced when written
+
+PARTS = Tuple[str, ...]
+CHUNK_SIZE = 1024 * 1024
+
+_intern = sys.intern
+
+class Entry:
+    """A file or directory of a template.
+
+    Entries are kept small on purpose, since generated templates can have hundreds of
+    thousands of them: the path is a tuple of interned components (shared with every
+    other entry using them), and what ``data`` holds depends on the ``kind``:
+
+    - :data:`DIRECTORY`: nothing.
+    - :data:`DATA`: the file contents, as ``bytes`` (shared by entries with the same body).
+    - :data:`SOURCE`: the path of the file to copy.
+    - :data:`PACK`: the memory-mapped pack, with the file at ``offset``.
+    - :data:`LAZY`: a lazy source (see :func:`is_lazy_source`); its size is only known
+      once it's written.
+
+    Args:
+        parts (tuple of str): The path components, relative to the template root.
+        kind (int): The entry kind.
+        data (Any, optional): The contents, as described above.
+        size (int, optional): The file size.
+        offset (int, optional): Where the file starts in a pack.
+        mode (int, optional): The permission bits of a packed or source file.
+    """
+    __slots__ = (
+        "parts",
+        "kind",
+        "data",
+        "size",
+        "offset",
+        "mode"
+    )
+    parts: PARTS
+    kind: int
+    data: Any
+    size: int
+    offset: int
+    mode: Optional[int]
+
+    def __init__(
+        self,
+        parts: PARTS,
+        kind: int,
+        data: Any = None,
+        size: int = 0,
+        offset: int = 0,
+        mode: Optional[int] = None
+    ):
+        self.parts = parts
+        self.kind = kind
+        self.data = data
+        self.size = size
+        self.offset = offset
+        self.mode = mode
+
+    @property
+    def path(self) -> str:
+        """The path relative to the template root, separated with ``/``."""
+        return "/".join(self.parts)
+
+    @property
+    def is_dir(self) -> bool:
+        """Whether this is a directory."""
+        return self.kind == DIRECTORY
+
+    def __repr__(self) -> str:
+        kind = ("directory", "data", "source", "pack", "lazy")[self.kind]
+        return f"Entry({self.path!r}, {kind}, size={self.size})"
+
+def split_path(path: str) -> PARTS:
+    """Splits a relative path into interned components.
+
+    Args:
+        path (str): The path, separated with ``/`` or ``\\``.
+    """
+    path = path.replace("\\", "/").strip("/")
+    return tuple(_intern(part) for part in path.split("/")) if path else ()
+
+def is_lazy_source(value: Any) -> bool:
+    """Checks whether a directory dict value is a lazy source of file contents.
+
+    That's a callable (called when the file is written, and returning any of these, a
+    ``str`` or ``bytes``), a file-like object, an ``os.PathLike`` (like ``pathlib.Path``)
+    to copy, or an iterable of ``bytes`` or ``str`` chunks.
+
+    Args:
+        value (Any): The value.
+    """
+    return callable(value) \
+        or hasattr(value, "read") \
+        or isinstance(value, os.PathLike) \
+        or hasattr(value, "__iter__") and not isinstance(value, (str, bytes, bytearray, dict))
+
+def resolve_source(source: Any) -> Any:
+    """Calls a callable lazy source, so that what's left can be streamed.
+
+    Args:
+        source (Any): The lazy source.
+    """
+    if callable(source) and not hasattr(source, "read"):
+        source = source()
+
+    if isinstance(source, str):
+        return bytes(source, encoding="utf-8")
+
+    return source
+
+def write_source(file: BinaryIO, source: Any) -> int:
+    """Streams a lazy source into a binary file, chunk by chunk, and returns its size.
+
+    File-like objects are read to the end but not closed; iterables are consumed.
+
+    Args:
+        file (binary file): The output file.
+        source (Any): The lazy source.
+    """
+    source = resolve_source(source)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return file.write(source)
+
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as data:
+            start = file.tell()
+            shutil.copyfileobj(data, file, CHUNK_SIZE)
+            return file.tell() - start
+
+    if hasattr(source, "read"):
+        chunks = iter(lambda: source.read(CHUNK_SIZE), source.read(0))
+    else:
+        chunks = source
+
+    size = 0
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = bytes(chunk, encoding="utf-8")
+
+        size += file.write(chunk)
+
+    return size
@@ -0,0 +1,224 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple, Union
+
+
+IGNORES = Optional[Union[Dict[str, Any], Iterable[str]]]
+GLOB_CHARS = frozenset("*?[")
+
+def translate(pattern: str) -> str:
+    """Translates a gitignore-style glob into a regular expression.
+
+    ``*`` and ``?`` never cross a ``/``, while ``**`` matches any number of directories.
+
+    Args:
+        pattern (str): The glob, without leading or trailing slashes.
+    """
+    i = 0
+    result = ""
+
+    while i < len(pattern):
+        char = pattern[i]
+
+        if pattern.startswith("**/", i):
+            result += "(?:.*/)?"
+            i += 3
+            continue
+
+        if pattern.startswith("**", i):
+            result += ".*"
+            i += 2
+            continue
+
+        if char == "*":
+            result += "[^/]*"
+
+        elif char == "?":
+            result += "[^/]"
+
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+
+            if end == -1:
+                result += re.escape(char)
+            else:
+                inner = pattern[i + 1:end]
+                if inner.startswith("!"):
+                    inner = "^" + inner[1:]
+
+                result += f"[{inner}]"
+                i = end
+
+        else:
+            result += re.escape(char)
+
+        i += 1
+
+    return result
+
+class IgnoreMatcher:
+    """Decides which template paths to ignore.
+
+    Literal paths go into a path trie and literal names into a set, so a lookup costs
+    one step per path component instead of one comparison per rule. Matching is done
+    on whole components, so ignoring ``venv`` never drops ``venv2.py``. An ignored
+    directory takes everything under it along. Globs matching a single name are
+    remembered per name, since the same names come up again in every directory.
+
+    Args:
+        ignores (dict of str: Any | iterable of str, optional): A directory dict representing which files
+            and directories to exclude (keys may be globs), or gitignore-style patterns such as
+            ``"node_modules/"``, ``"*.pyc"``, ``"/build"`` or ``"docs/**/*.tmp"``. Negation (``!``)
+            is not supported.
+    """
+    __slots__ = (
+        "trie",
+        "names",
+        "dir_names",
+        "globs",
+        "name_matches"
+    )
+    trie: Dict[str, Any]
+    names: set
+    dir_names: set
+    globs: List[Tuple[Pattern, bool, bool]]
+    name_matches: Dict[Tuple[str, bool], bool]
+
+    def __init__(self, ignores: IGNORES = None):
+        self.trie = {}
+        self.names = set()
+        self.dir_names = set()
+        self.globs = []
+        self.name_matches = {}
+
+        if isinstance(ignores, dict):
+            self.add_dict(ignores)
+
+        elif ignores:
+            for pattern in ignores:
+                self.add_pattern(pattern)
+
+    def __bool__(self) -> bool:
+        return bool(self.trie or self.names or self.dir_names or self.globs)
+
+    def add_dict(self, data: Dict[str, Any], prefix: str = "") -> None:
+        """Adds rules from a directory dict.
+
+        Non-empty dicts only ignore what's listed inside them; anything else (``...``, file
+        contents or an empty dict) ignores the path itself.
+
+        Args:
+            data (dict of str: Any): The directory dict.
+            prefix (str, optional): The path the dict is located at.
+        """
+        for key, value in data.items():
+            if isinstance(value, dict) and value:
+                self.add_dict(value, f"{prefix}{key}/")
+            else:
+                self.add_pattern(f"/{prefix}{key}")
+
+    def add_pattern(self, pattern: str) -> None:
+        """Adds a gitignore-style pattern.
+
+        Args:
+            pattern (str): The pattern. Blank lines and ``#`` comments are skipped.
+        """
+        pattern = pattern.strip().replace("\\", "/")
+
+        if not pattern or pattern.startswith("#"):
+            return
+
+        dir_only = pattern.endswith("/")
+        body = pattern.rstrip("/")
+        anchored = "/" in body
+        body = body.lstrip("/")
+        literal = not GLOB_CHARS.intersection(body)
+
+        if not body:
+            return
+
+        if literal and not anchored:
+            (self.dir_names if dir_only else self.names).add(body)
+
+        elif literal and not dir_only:
+            node = self.trie
+            for part in body.split("/"):
+                node = node.setdefault(part, {})
+
+            node[""] = True # the terminal marker; never a valid component
+
+        else:
+            self.globs.append((re.compile(translate(body)), anchored, dir_only))
+            self.name_matches.clear()
+
+    def matches(self, path: str, is_dir: bool = False) -> bool:
+        """Checks whether a path (or one of its parent directories) is ignored.
+
+        Args:
+            path (str): The path relative to the template root.
+            is_dir (bool, optional): Whether the path is a directory.
+        """
+        return self.matches_parts(path.replace("\\", "/").strip("/").split("/"), is_dir)
+
+    def matches_parts(
+        self,
+        parts: Sequence[str],
+        is_dir: bool = False,
+        *,
+        leaf_only: bool = False
+    ) -> bool:
+        """Checks whether a path, already split into components, is ignored.
+
+        Args:
+            parts (sequence of str): The path components, relative to the template root.
+            is_dir (bool, optional): Whether the path is a directory.
+            leaf_only (bool, optional): Whether the parent directories are already known not to
+                be ignored (like when walking a tree and skipping ignored directories), so that
+                only the last component needs checking.
+        """
+        last = len(parts) - 1
+        first = last if leaf_only else 0
+        node = self.trie
+
+        for index, part in enumerate(parts):
+            if node is not None:
+                node = node.get(part)
+
+                if node is not None and "" in node:
+                    return True
+
+            if index < first:
+                continue
+
+            if part in self.names \
+            or part in self.dir_names and (index < last or is_dir):
+                return True
+
+        if self.globs:
+            for index in range(first, last + 1):
+                part = parts[index]
+                directory = index < last or is_dir
+                matched = self.name_matches.get((part, directory))
+
+                if matched is None:
+                    matched = self.name_matches[part, directory] = any(
+                        regex.fullmatch(part)
+                        for regex, anchored, dir_only in self.globs
+                        if not anchored and (directory or not dir_only)
+                    )
+
+                if matched:
+                    return True
+
+                prefix = None
+
+                for regex, anchored, dir_only in self.globs:
+                    if not anchored or dir_only and not directory:
+                        continue
+
+                    if prefix is None:
+                        prefix = "/".join(parts[:index + 1])
+
+                    if regex.fullmatch(prefix):
+                        return True
+
+        return False
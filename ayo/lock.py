@@ -0,0 +1,123 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+from . import store
+
+
+LOCK_FILE = "ayo.lock"
+LOCK_VERSION = 1
+
+def lock_key(owner: str, name: str, branch: str) -> str:
+    """Gets the key of a script in the lock, written like on the command line.
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+    """
+    return f"@{owner}/{name}[{branch}]"
+
+def load_lock(path: str = LOCK_FILE) -> Dict[str, dict]:
+    """Loads the locked scripts as ``{key: {"commit": sha, "files": {path: blob hash}}}``.
+
+    Returns an empty dict if there's no lock yet.
+
+    Args:
+        path (str, optional): The lock path.
+
+    Raises:
+        ValueError: The lock is from a newer version of ayo.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+
+    if data.get("version", LOCK_VERSION) > LOCK_VERSION:
+        raise ValueError(f"{path} was written by a newer version of ayo")
+
+    return data.get("scripts", {})
+
+def save_lock(scripts: Dict[str, dict], path: str = LOCK_FILE) -> None:
+    """Saves the locked scripts, sorted so that diffs stay small.
+
+    Args:
+        scripts (dict of str: dict): The locked scripts.
+        path (str, optional): The lock path.
+    """
+    tmp = path + ".tmp"
+
+    with open(tmp, "w", encoding="utf-8") as file:
+        json.dump({"version": LOCK_VERSION, "scripts": scripts}, file, indent=4, sort_keys=True)
+        file.write("\n")
+
+    os.replace(tmp, path)
+
+def lock_script(owner: str, name: str, branch: str, path: str = LOCK_FILE) -> None:
+    """Records the revision of a script installed in this project (from its own manifest)
+    in the lock.
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+        path (str, optional): The lock path.
+    """
+    manifest = store.load_installed(f".ayo-scripts/{owner}~{name}~{branch}/")
+
+    if manifest is None:
+        return
+
+    scripts = load_lock(path)
+    entry = {"commit": manifest.get("commit"), "files": manifest['files']}
+    key = lock_key(owner, name, branch)
+
+    if scripts.get(key) != entry:
+        scripts[key] = entry
+        save_lock(scripts, path)
+
+def unlock_script(owner: str, name: str, branch: str, path: str = LOCK_FILE) -> None:
+    """Removes a script from the lock.
+
+    Args:
+        owner (str): The repository owner.
+        name (str): The repository name.
+        branch (str): The branch.
+        path (str, optional): The lock path.
+    """
+    scripts = load_lock(path)
+
+    if scripts.pop(lock_key(owner, name, branch), None) is not None:
+        save_lock(scripts, path)
+
+def verify_locked(entry: dict) -> List[str]:
+    """Checks that every file of a locked script is in the store, unmodified.
+
+    Returns the paths that are missing or don't match their locked hash.
+
+    Args:
+        entry (dict): The lock entry.
+    """
+    problems = []
+
+    for path, sha in entry['files'].items():
+        if not store.has_blob(sha, verify=True):
+            problems.append(path)
+
+    return problems
+
+def locked_config(entry: dict) -> Optional[dict]:
+    """Reads the ``ayo.config.json`` of a locked script from the store.
+
+    Args:
+        entry (dict): The lock entry.
+    """
+    sha = entry['files'].get("ayo.config.json")
+
+    if not sha or not store.has_blob(sha):
+        return None
+
+    with open(store.blob_path(sha), "r", encoding="utf-8") as file:
+        return json.load(file)
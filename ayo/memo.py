@@ -0,0 +1,176 @@
+import hashlib
+import json
+import marshal
+import os
+import pickle
+import shutil
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+MEMO_DIR = os.environ.get(
+    "AYO_MEMO",
+    os.path.join(os.path.expanduser("~"), ".ayo", "memo")
+)
+MAX_SIZE = 256 * 1024 * 1024
+MAX_AGE = 7 * 24 * 60 * 60
+
+def memo_key(function: Callable, args: Sequence[Any]) -> Optional[str]:
+    """Gets the memoization key of a step call.
+
+    The key covers the step's identity (module, name and compiled code, so editing the
+    step invalidates it) and a hash of its input. Returns ``None`` if the input cannot
+    be pickled.
+
+    Args:
+        function (callable): The step.
+        args (sequence of Any): The args it's called with.
+    """
+    try:
+        arguments = pickle.dumps(tuple(args))
+    except Exception: # noqa
+        return None
+
+    sha = hashlib.sha256()
+    sha.update(f"{function.__module__}.{function.__qualname__}".encode("utf-8"))
+
+    code = getattr(function, "__code__", None)
+    if code is not None:
+        sha.update(marshal.dumps(code))
+
+    sha.update(arguments)
+    return sha.hexdigest()
+
+class Memo:
+    """An on-disk cache of step results, with size- and age-based eviction.
+
+    Each entry is a pickle next to a small JSON file describing it. Hits refresh an
+    entry's age, and the oldest entries are evicted first.
+
+    Args:
+        directory (str, optional): Where to keep entries.
+        max_size (int, optional): The maximum total size in bytes.
+        max_age (int | float, optional): The maximum age in seconds since an entry was last used.
+    """
+    __slots__ = (
+        "directory",
+        "max_size",
+        "max_age"
+    )
+    directory: str
+    max_size: int
+    max_age: float
+
+    def __init__(
+        self,
+        directory: str = MEMO_DIR,
+        *,
+        max_size: int = MAX_SIZE,
+        max_age: float = MAX_AGE
+    ):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def load(self, key: str) -> Tuple[bool, Any]:
+        """Looks up an entry. Returns ``(hit, value)``.
+
+        Args:
+            key (str): The key.
+        """
+        path = os.path.join(self.directory, key + ".pickle")
+
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return False, None
+
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False, None
+
+        os.utime(path)
+        return True, value
+
+    def save(self, key: str, name: str, value: Any) -> None:
+        """Stores an entry, then evicts old ones if needed. Unpicklable values are skipped.
+
+        Args:
+            key (str): The key.
+            name (str): The step name, for :meth:`entries`.
+            value (Any): The value.
+        """
+        try:
+            data = pickle.dumps(value)
+        except Exception: # noqa
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, key)
+
+        with open(path + ".json.tmp", "w", encoding="utf-8") as file:
+            json.dump({"step": name, "size": len(data), "created": time.time()}, file)
+
+        with open(path + ".pickle.tmp", "wb") as file:
+            file.write(data)
+
+        os.replace(path + ".json.tmp", path + ".json")
+        os.replace(path + ".pickle.tmp", path + ".pickle")
+        self.evict()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Lists entries (``key``, ``step``, ``size``, ``created`` and ``used``), most recently used first."""
+        if not os.path.isdir(self.directory):
+            return []
+
+        result = []
+
+        for fn in os.listdir(self.directory):
+            if not fn.endswith(".pickle"):
+                continue
+
+            key = fn[:-len(".pickle")]
+            path = os.path.join(self.directory, key)
+
+            try:
+                with open(path + ".json", "r", encoding="utf-8") as file:
+                    info = json.load(file)
+
+                info['used'] = os.path.getmtime(path + ".pickle")
+                info['size'] = os.path.getsize(path + ".pickle")
+            except (OSError, ValueError):
+                continue
+
+            info['key'] = key
+            result.append(info)
+
+        result.sort(key=lambda info: info['used'], reverse=True)
+        return result
+
+    def remove(self, key: str) -> None:
+        """Removes an entry.
+
+        Args:
+            key (str): The key.
+        """
+        for extension in (".pickle", ".json"):
+            try:
+                os.remove(os.path.join(self.directory, key + extension))
+            except FileNotFoundError:
+                pass
+
+    def evict(self) -> None:
+        """Removes expired entries, then the least recently used ones until under ``max_size``."""
+        now = time.time()
+        total = 0
+
+        for info in self.entries():
+            if now - info['used'] > self.max_age or total + info['size'] > self.max_size:
+                self.remove(info['key'])
+            else:
+                total += info['size']
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        shutil.rmtree(self.directory, ignore_errors=True)
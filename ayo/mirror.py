@@ -0,0 +1,397 @@
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set, Tuple, Type
+from urllib.parse import quote, unquote, urlsplit
+
+from . import store
+from .download import (
+    CHUNK_SIZE,
+    DEFAULT_MIRROR_PORT,
+    DEFAULT_MIRROR_TTL,
+    GITHUB_API_URL,
+    GITHUB_RAW_URL,
+    download_file,
+    get_session
+)
+
+
+COMMIT = re.compile(r"[0-9a-f]{40}")
+RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+RAW_ROUTE = re.compile(r"/raw/([^/]+)/([^/]+)/([^/]+)/(.+)")
+TREE_ROUTE = re.compile(r"/api/repos/([^/]+)/([^/]+)/git/trees/(.+)")
+COMMIT_ROUTE = re.compile(r"/api/repos/([^/]+)/([^/]+)/commits/(.+)")
+
+# path -> (blob hash, size)
+TREE = Dict[str, Tuple[str, int]]
+
+class Mirror:
+    """A caching mirror of the GitHub endpoints ayo downloads scripts from.
+
+    Files live in the global store, keyed by blob hash, and are fetched from upstream the
+    first time they're asked for, and hashed once (when added, or first served) rather
+    than on every request. Trees are cached per commit (they never change), and
+    branch heads are revalidated with a conditional request at most every ``ttl``
+    seconds, falling back to the last known commit when upstream can't be reached.
+
+    Args:
+        upstream (str, optional): Another mirror to fetch from, instead of GitHub.
+        ttl (int | float, optional): How long a resolved branch head is trusted, in seconds.
+    """
+    __slots__ = (
+        "raw_url",
+        "api_url",
+        "ttl",
+        "directory",
+        "heads",
+        "trees",
+        "lock",
+        "locks",
+        "verified"
+    )
+    raw_url: str
+    api_url: str
+    ttl: float
+    directory: str
+
+    def __init__(self, *, upstream: Optional[str] = None, ttl: float = DEFAULT_MIRROR_TTL):
+        upstream = upstream.rstrip("/") if upstream else None
+        self.raw_url = upstream + "/raw" if upstream else GITHUB_RAW_URL
+        self.api_url = upstream + "/api" if upstream else GITHUB_API_URL
+        self.ttl = ttl
+        self.directory = os.path.join(store.STORE_DIR, "mirror")
+        self.heads: Dict[str, dict] = {}
+        self.trees: Dict[str, TREE] = {}
+        self.lock = threading.Lock()
+        self.locks: Dict[str, threading.Lock] = {}
+        self.verified: Set[str] = set()
+
+    def key_lock(self, key: str) -> threading.Lock:
+        """Gets the lock for one branch head or blob, so concurrent misses fetch it only once.
+
+        Args:
+            key (str): The key.
+        """
+        with self.lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def _load(self, kind: str, key: str) -> Optional[dict]:
+        path = os.path.join(self.directory, kind, key + ".json")
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save(self, kind: str, key: str, data: dict) -> None:
+        path = os.path.join(self.directory, kind, key + ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = store.temp_path()
+
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+        os.replace(tmp, path)
+
+    def resolve(self, owner: str, name: str, ref: str) -> Optional[str]:
+        """Resolves a branch (or commit) to a commit hash. Returns ``None`` if unknown.
+
+        Args:
+            owner (str): The repository owner.
+            name (str): The repository name.
+            ref (str): The branch, or a full commit hash.
+        """
+        if COMMIT.fullmatch(ref):
+            return ref
+
+        key = f"{owner}~{name}~{ref}"
+
+        with self.key_lock("head:" + key):
+            head = self.heads.get(key) or self._load("heads", key)
+
+            if head and time.time() - head['checked'] < self.ttl:
+                return head['commit']
+
+            headers = {"Accept": "application/vnd.github.sha"}
+            if head and head.get("etag"):
+                headers["If-None-Match"] = head['etag']
+
+            try:
+                r = get_session().get(
+                    f"{self.api_url}/repos/{owner}/{name}/commits/{quote(ref)}",
+                    headers=headers
+                )
+            except OSError:
+                r = None
+
+            if r is not None and r.status_code == 304:
+                head['checked'] = time.time()
+
+            elif r is not None and r.status_code == 200:
+                head = {
+                    "commit": r.text.strip(),
+                    "etag": r.headers.get("ETag"),
+                    "checked": time.time()
+                }
+
+            elif r is not None and r.status_code == 404:
+                return None
+
+            if not head:
+                return None
+
+            self.heads[key] = head
+            self._save("heads", key, head)
+            return head['commit']
+
+    def tree(self, owner: str, name: str, commit: str) -> Optional[TREE]:
+        """Gets every file of a commit as ``{path: (blob hash, size)}``.
+
+        Returns ``None`` if it can't be listed (or upstream truncated it).
+
+        Args:
+            owner (str): The repository owner.
+            name (str): The repository name.
+            commit (str): The commit hash.
+        """
+        key = f"{owner}~{name}~{commit}"
+        tree = self.trees.get(key)
+
+        if tree is not None:
+            return tree
+
+        with self.key_lock("tree:" + key):
+            data = self._load("trees", key)
+
+            if data is None:
+                try:
+                    r = get_session().get(
+                        f"{self.api_url}/repos/{owner}/{name}/git/trees/{commit}?recursive=1"
+                    )
+                except OSError:
+                    return None
+
+                if r.status_code != 200 or r.json().get("truncated"):
+                    return None
+
+                data = {
+                    item['path']: (item['sha'], item.get("size", 0))
+                    for item in r.json()['tree']
+                    if item['type'] == "blob"
+                }
+                self._save("trees", key, data)
+
+            tree = {path: tuple(entry) for path, entry in data.items()}
+            self.trees[key] = tree
+            return tree
+
+    def blob(self, owner: str, name: str, commit: str, path: str) -> Optional[str]:
+        """Makes sure a file of a commit is in the store and returns its blob hash.
+
+        Returns ``None`` if the file doesn't exist or can't be fetched.
+
+        Args:
+            owner (str): The repository owner.
+            name (str): The repository name.
+            commit (str): The commit hash.
+            path (str): The file path.
+        """
+        tree = self.tree(owner, name, commit)
+
+        if not tree or path not in tree:
+            return None
+
+        sha = tree[path][0]
+
+        if sha in self.verified and store.has_blob(sha):
+            return sha
+
+        with self.key_lock("blob:" + sha):
+            if store.has_blob(sha, verify=sha not in self.verified):
+                self.verified.add(sha)
+                return sha
+
+            tmp = store.temp_path()
+            status, digest = download_file(
+                f"{self.raw_url}/{owner}/{name}/{commit}/{quote(path)}",
+                tmp,
+                hasher=store.blob_hasher
+            )
+
+            if status != 200:
+                return None
+
+            try:
+                store.add_blob_file(tmp, sha, sha=digest)
+            except ValueError:
+                return None
+
+            self.verified.add(sha)
+            return sha
+
+    def handler(self) -> Type[BaseHTTPRequestHandler]:
+        """Creates a request handler class serving this mirror."""
+        return type("MirrorHandler", (_MirrorHandler,), {"mirror": self})
+
+class _MirrorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+    mirror: Mirror
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self.route(body=False)
+
+    def do_GET(self) -> None:
+        self.route(body=True)
+
+    def route(self, *, body: bool) -> None:
+        path = urlsplit(self.path).path
+
+        match = RAW_ROUTE.fullmatch(path)
+        if match:
+            owner, name, ref, file = (unquote(group) for group in match.groups())
+            commit = self.mirror.resolve(owner, name, ref)
+            sha = commit and self.mirror.blob(owner, name, commit, file)
+
+            if not sha:
+                return self.reply(404, b"404: Not Found", body=body)
+
+            return self.send_blob(sha, body=body)
+
+        match = TREE_ROUTE.fullmatch(path)
+        if match:
+            owner, name, ref = (unquote(group) for group in match.groups())
+            commit = self.mirror.resolve(owner, name, ref)
+            tree = commit and self.mirror.tree(owner, name, commit)
+
+            if not tree:
+                return self.reply(404, b'{"message": "Not Found"}', body=body)
+
+            return self.reply(200, json.dumps({
+                "sha": commit,
+                "truncated": False,
+                "tree": [
+                    {"path": file, "type": "blob", "sha": sha, "size": size}
+                    for file, (sha, size) in tree.items()
+                ]
+            }).encode("utf-8"), content_type="application/json", body=body)
+
+        match = COMMIT_ROUTE.fullmatch(path)
+        if match:
+            owner, name, ref = (unquote(group) for group in match.groups())
+            commit = self.mirror.resolve(owner, name, ref)
+
+            if not commit:
+                return self.reply(404, b'{"message": "Not Found"}', body=body)
+
+            etag = f'"{commit}"'
+
+            if self.headers.get("If-None-Match") == etag:
+                return self.reply(304, b"", headers={"ETag": etag}, body=False)
+
+            if "sha" in self.headers.get("Accept", ""):
+                return self.reply(200, commit.encode("ascii"), headers={"ETag": etag}, body=body)
+
+            return self.reply(
+                200,
+                json.dumps({"sha": commit}).encode("utf-8"),
+                content_type="application/json",
+                headers={"ETag": etag},
+                body=body
+            )
+
+        self.reply(404, b"404: Not Found", body=body)
+
+    def reply(
+        self,
+        status: int,
+        data: bytes,
+        *,
+        content_type: str = "text/plain; charset=utf-8",
+        headers: Optional[Dict[str, str]] = None,
+        body: bool = True
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+
+        self.end_headers()
+
+        if body:
+            self.wfile.write(data)
+
+    def send_blob(self, sha: str, *, body: bool) -> None:
+        path = store.blob_path(sha)
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = RANGE.fullmatch(self.headers.get("Range", "").strip())
+
+        if match and (match.group(1) or match.group(2)):
+            if not match.group(1):
+                start = max(size - int(match.group(2)), 0)
+            else:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+
+            if start > end:
+                return self.reply(
+                    416, b"", headers={"Content-Range": f"bytes */{size}"}, body=False
+                )
+
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+
+        length = end - start + 1 if size else 0
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{sha}"')
+        self.end_headers()
+
+        if not body:
+            return
+
+        with open(path, "rb") as file:
+            file.seek(start)
+
+            while length > 0:
+                chunk = file.read(min(CHUNK_SIZE, length))
+                if not chunk:
+                    break
+
+                self.wfile.write(chunk)
+                length -= len(chunk)
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_MIRROR_PORT,
+    *,
+    upstream: Optional[str] = None,
+    ttl: float = DEFAULT_MIRROR_TTL
+) -> ThreadingHTTPServer:
+    """Creates a server for a :class:`Mirror`. Call ``serve_forever()`` on it to start.
+
+    Point clients at it with ``AYO_MIRROR=http://<host>:<port>``.
+
+    Args:
+        host (str, optional): The host to bind.
+        port (int, optional): The port to bind. ``0`` picks a free one.
+        upstream (str, optional): Another mirror to fetch from, instead of GitHub.
+        ttl (int | float, optional): How long a resolved branch head is trusted, in seconds.
+    """
+    mirror = Mirror(upstream=upstream, ttl=ttl)
+    server = ThreadingHTTPServer((host, port), mirror.handler())
+    server.daemon_threads = True
+    return server
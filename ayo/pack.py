@@ -0,0 +1,132 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+from typing import BinaryIO, Dict, List
+
+from .entry import DIRECTORY, LAZY, PACK, SOURCE, Entry, split_path, write_source
+
+
+MAGIC = b"AYOPACK1"
+HEADER = struct.Struct("<8sQ") # magic, index length
+EXTENSION = ".ayopack"
+CHUNK_SIZE = 1024 * 1024
+
+def write_pack(contents: List[Entry], path: str) -> int:
+    """Writes template contents into a single ``.ayopack`` file.
+
+    The layout is a fixed header, a JSON index of ``[path, kind, mode, offset, size]``
+    entries, then every file payload back to back. Returns the size of the pack.
+
+    Contents loaded from another pack (:func:`read_pack`) are copied from its mapping, so a
+    pack can be repacked (e.g. with fewer entries) into a new path. Lazy contents are
+    spooled to temporary files first, since their sizes go in the index.
+
+    Args:
+        contents (list of Entry): The template contents (:attr:`Template.contents`).
+        path (str): The output path.
+    """
+    import tempfile
+
+    spooled: Dict[int, BinaryIO] = {}
+
+    try:
+        for position, entry in enumerate(contents):
+            if entry.kind == LAZY:
+                spooled[position] = tempfile.TemporaryFile()
+                write_source(spooled[position], entry.data)
+
+        return _write_pack(contents, path, spooled)
+
+    finally:
+        for spool in spooled.values():
+            spool.close()
+
+def _write_pack(contents: List[Entry], path: str, spooled: Dict[int, BinaryIO]) -> int:
+    index = []
+    offset = 0
+
+    for position, entry in enumerate(contents):
+        size = spooled[position].tell() if position in spooled else entry.size
+
+        if entry.kind == DIRECTORY:
+            index.append([entry.path, "d", 0o755, 0, 0])
+            continue
+
+        if entry.kind in (SOURCE, PACK):
+            mode = entry.mode
+        else:
+            mode = 0o644
+
+        index.append([entry.path, "f", mode, offset, size])
+        offset += size
+
+    index_bytes = bytes(
+        json.dumps({"entries": index}, separators=(",", ":")),
+        encoding="utf-8"
+    )
+    tmp = path + ".tmp"
+
+    with open(tmp, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(index_bytes)))
+        file.write(index_bytes)
+        start = file.tell()
+
+        for position, (entry, (fn, kind, _, offset, size)) in enumerate(zip(contents, index)):
+            if kind == "d":
+                continue
+
+            if position in spooled:
+                spooled[position].seek(0)
+                shutil.copyfileobj(spooled[position], file, CHUNK_SIZE)
+            elif entry.kind == SOURCE:
+                with open(entry.data, "rb") as source:
+                    shutil.copyfileobj(source, file, CHUNK_SIZE)
+            elif entry.kind == PACK:
+                file.write(memoryview(entry.data)[entry.offset:entry.offset + size])
+            else:
+                file.write(entry.data)
+
+            if file.tell() - start != offset + size:
+                raise RuntimeError(f"{fn!r} changed while it was being packed")
+
+        total = file.tell()
+
+    os.replace(tmp, path)
+    return total
+
+def read_pack(path: str) -> List[Entry]:
+    """Loads a ``.ayopack`` file as template contents.
+
+    The pack is memory-mapped; file entries refer to slices of the mapping instead of
+    holding their bytes.
+
+    Args:
+        path (str): The pack path.
+
+    Raises:
+        ValueError: The file is not an ayo pack.
+    """
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapping) < HEADER.size:
+        raise ValueError(f"{path!r} is not an ayo pack")
+
+    magic, index_length = HEADER.unpack_from(mapping)
+    if magic != MAGIC:
+        raise ValueError(f"{path!r} is not an ayo pack")
+
+    start = HEADER.size + index_length
+    index = json.loads(mapping[HEADER.size:start])
+    contents = []
+
+    for fn, kind, mode, offset, size in index['entries']:
+        if kind == "d":
+            contents.append(Entry(split_path(fn), DIRECTORY))
+            continue
+
+        contents.append(Entry(split_path(fn), PACK, mapping, size, start + offset, mode))
+
+    return contents
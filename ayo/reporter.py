@@ -0,0 +1,181 @@
+import os
+import time
+from typing import TYPE_CHECKING, Optional
+
+from .utils import LazyConsole, bytes_to_readable
+
+if TYPE_CHECKING:
+    from rich.progress import Progress
+
+    from .sync import Changes
+
+
+RENDER_MODES = ("verbose", "summary", "silent")
+REFRESH_INTERVAL = 0.1
+console = LazyConsole()
+
+class InstallReporter:
+    """Reports the progress of an install according to a rendering policy.
+
+    - ``verbose``: logs every entry, like ayo always did.
+    - ``summary``: a progress bar (only on terminals) updated at most every
+      :data:`REFRESH_INTERVAL` seconds, followed by one aggregate line.
+    - ``silent``: nothing at all.
+
+    Args:
+        total (int): The amount of entries.
+        render (str, optional): The rendering policy. Defaults to ``AYO_RENDER``, or ``verbose``
+            on terminals and ``summary`` otherwise.
+        description (str, optional): The progress bar description.
+        changes (Changes, optional): The changes of a sync, summarized at the end instead of
+            what was created.
+
+    Example:
+        .. code-block :: python
+
+            with InstallReporter(len(entries)) as reporter:
+                for entry in entries:
+                    ... # write it
+                    if reporter.verbose:
+                        reporter.log(f"created {entry}")
+
+                    reporter.advance(size)
+    """
+    __slots__ = (
+        "render",
+        "verbose",
+        "total",
+        "description",
+        "progress",
+        "task",
+        "files",
+        "directories",
+        "size",
+        "pending",
+        "started",
+        "last_refresh",
+        "changes"
+    )
+    render: str
+    verbose: bool
+    progress: Optional["Progress"]
+    changes: Optional["Changes"]
+
+    def __init__(
+        self,
+        total: int,
+        *,
+        render: Optional[str] = None,
+        description: str = "[green]Creating new project...",
+        changes: Optional["Changes"] = None
+    ):
+        render = render or os.environ.get("AYO_RENDER") \
+            or ("verbose" if console.is_terminal else "summary")
+
+        if render not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode {render!r}, expected one of {RENDER_MODES}")
+
+        self.render = render
+        self.verbose = render == "verbose"
+        self.total = total
+        self.description = description
+        self.progress = None
+        self.task = None
+        self.files = 0
+        self.directories = 0
+        self.size = 0
+        self.pending = 0
+        self.started = 0.0
+        self.last_refresh = 0.0
+        self.changes = changes
+
+    def __enter__(self) -> "InstallReporter":
+        self.started = time.perf_counter()
+
+        if self.verbose or self.render == "summary" and console.is_terminal:
+            from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn
+
+            self.progress = Progress(
+                SpinnerColumn(),
+                *Progress.get_default_columns(),
+                TimeElapsedColumn(),
+                console=console.load()
+            )
+            self.progress.start()
+            self.task = self.progress.add_task(self.description, total=self.total)
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+        if self.progress:
+            self.progress.stop()
+
+        if self.render != "silent":
+            elapsed = time.perf_counter() - self.started
+            speed = self.size / (1024 ** 2) / elapsed if elapsed else 0.0
+
+            if self.changes is not None:
+                changes = self.changes
+                stale = f", {len(changes.stale)} stale" if changes.stale else ""
+                removed = f" ({len(changes.removed)} removed)" if changes.removed else ""
+                console.print(
+                    f"synced: {len(changes.created)} created, {len(changes.updated)} updated, "
+                    f"{len(changes.unchanged)} unchanged{stale}{removed}, "
+                    f"{bytes_to_readable(self.size)} written in {elapsed:.2f}s"
+                )
+                return
+
+            console.print(
+                f"created {self.files} files and {self.directories} directories, "
+                f"{bytes_to_readable(self.size)} in {elapsed:.2f}s "
+                f"[d white]({speed:.2f} MB/s)[/d white]"
+            )
+
+    def log(self, message: str) -> None:
+        """Logs a message for a single entry. Only shown in ``verbose`` mode.
+
+        Check :attr:`verbose` before formatting expensive messages.
+
+        Args:
+            message (str): The message.
+        """
+        if self.verbose:
+            self.progress.log(message)
+
+    def advance(self, size: Optional[int] = None) -> None:
+        """Marks an entry as done.
+
+        Args:
+            size (int, optional): The file size. ``None`` for directories and skipped entries.
+        """
+        if size is not None:
+            self.files += 1
+            self.size += size
+
+        self.pending += 1
+
+        if self.progress is None:
+            return
+
+        if self.verbose:
+            self.flush()
+            return
+
+        now = time.perf_counter()
+        if now - self.last_refresh >= REFRESH_INTERVAL:
+            self.last_refresh = now
+            self.flush()
+
+    def directory(self) -> None:
+        """Marks a directory as created."""
+        self.directories += 1
+        self.advance()
+
+    def flush(self) -> None:
+        """Pushes pending progress to the progress bar."""
+        if self.progress is not None and self.pending:
+            self.progress.update(self.task, advance=self.pending)
+
+        self.pending = 0
@@ -0,0 +1,313 @@
+import os
+import runpy
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from contextlib import suppress
+from typing import Any, Dict, List, Optional, Union
+
+
+EXEC_MODES = ("subprocess", "inprocess", "fork")
+DEFAULT_EXEC_MODE = os.environ.get("AYO_EXEC", "subprocess")
+DEFAULT_SCRIPT_JOBS = max(os.cpu_count() or 1, 4)
+
+def run_in_process(bin_path: str, argv: List[str]) -> int:
+    """Runs a script in this interpreter with ``runpy`` and returns its exit code.
+
+    ``sys.argv`` and ``sys.path`` are set up like ``python <bin_path> <argv>`` would, and
+    modules the script newly imported from its own directory are dropped afterwards, so
+    that scripts run one after another don't see each other's helper modules. Everything
+    else (``ayo``, ``rich``, third-party packages, even if they live in a virtual
+    environment under the script's directory) stays imported and warm.
+
+    Args:
+        bin_path (str): The script path, relative to the current directory.
+        argv (list of str): The args.
+    """
+    directory = os.path.dirname(os.path.abspath(bin_path))
+    old_argv = sys.argv
+    old_path = sys.path[:]
+    old_modules = set(sys.modules)
+    sys.argv = [bin_path, *argv]
+    sys.path.insert(0, directory)
+
+    try:
+        runpy.run_path(bin_path, run_name="__main__")
+        return 0
+
+    except SystemExit as exc:
+        if exc.code is None or isinstance(exc.code, int):
+            return exc.code or 0
+
+        print(exc.code, file=sys.stderr)
+        return 1
+
+    except KeyboardInterrupt:
+        raise
+
+    except BaseException: # noqa
+        traceback.print_exc()
+        return 1
+
+    finally:
+        sys.argv = old_argv
+        sys.path[:] = old_path
+
+        for name in set(sys.modules) - old_modules:
+            filename = getattr(sys.modules[name], "__file__", None) or ""
+            if filename and os.path.abspath(filename).startswith(directory + os.sep):
+                del sys.modules[name]
+
+def run_forked(bin_path: str, argv: List[str]) -> int:
+    """Runs a script in a forked copy of this process and returns its exit code.
+
+    The child starts with everything this process already imported, so there's no
+    interpreter start-up to pay for, while the script still can't affect ayo itself.
+    Falls back to a subprocess where ``fork`` isn't available.
+
+    Args:
+        bin_path (str): The script path, relative to the current directory.
+        argv (list of str): The args.
+    """
+    if not hasattr(os, "fork"):
+        return run_subprocess(bin_path, argv)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+
+    if pid == 0:
+        code = 1
+
+        try:
+            code = run_in_process(bin_path, argv)
+        except KeyboardInterrupt:
+            code = 130
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code & 0xFF)
+
+    while True:
+        try:
+            _, status = os.waitpid(pid, 0)
+            break
+        except KeyboardInterrupt:
+            continue # the child got it too; wait for it to finish
+
+    return os.waitstatus_to_exitcode(status)
+
+def run_subprocess(bin_path: str, argv: List[str]) -> int:
+    """Runs a script with the interpreter ayo is running under and returns its exit code.
+
+    Args:
+        bin_path (str): The script path, relative to the current directory.
+        argv (list of str): The args.
+    """
+    return subprocess.call([sys.executable, bin_path, *argv])
+
+def run_bin(bin_path: str, argv: List[str], *, mode: str = DEFAULT_EXEC_MODE) -> int:
+    """Runs a script and returns its exit code.
+
+    Args:
+        bin_path (str): The script path, relative to the current directory.
+        argv (list of str): The args.
+        mode (str, optional): ``subprocess`` (a fresh ``sys.executable``), ``inprocess`` (``runpy``
+            in this interpreter) or ``fork`` (a forked copy of this process). Defaults to ``AYO_EXEC``,
+            or ``subprocess``.
+
+    Raises:
+        ValueError: Unknown mode.
+    """
+    if mode == "subprocess":
+        return run_subprocess(bin_path, argv)
+
+    if mode == "inprocess":
+        return run_in_process(bin_path, argv)
+
+    if mode == "fork":
+        return run_forked(bin_path, argv)
+
+    raise ValueError(f"Unknown exec mode {mode!r}, expected one of {EXEC_MODES}")
+
+def plan_before_scripts(before_scripts: Union[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Turns the ``before-scripts`` config into commands with dependencies.
+
+    - a string: one command.
+    - a list, where each item runs after the previous one finished; an item is either
+      a command, a list of commands (a group that runs in parallel), or a
+      ``{"name": ..., "run": ..., "needs": [...]}`` dict, which only waits for the
+      commands it ``needs`` (by name).
+
+    Returns dicts with ``name``, ``run`` and ``needs`` (a list of names).
+
+    Args:
+        before_scripts (str | list): The ``before-scripts`` config.
+
+    Raises:
+        ValueError: Invalid config, unknown names in ``needs``, or a cycle.
+    """
+    if isinstance(before_scripts, str):
+        before_scripts = [before_scripts]
+
+    nodes = []
+    names = set()
+    previous: List[str] = []
+
+    def add(run: str, needs: List[str], name: Optional[str] = None) -> str:
+        name = name or run.split(" ", 1)[0]
+        unique = name
+        count = 1
+
+        while unique in names:
+            count += 1
+            unique = f"{name}:{count}"
+
+        names.add(unique)
+        nodes.append({"name": unique, "run": run, "needs": list(needs)})
+        return unique
+
+    for item in before_scripts:
+        if isinstance(item, str):
+            previous = [add(item, previous)]
+
+        elif isinstance(item, list):
+            previous = [add(cmd, previous) for cmd in item]
+
+        elif isinstance(item, dict) and "run" in item:
+            previous = [add(item['run'], item.get('needs', []), item.get('name'))]
+
+        else:
+            raise ValueError(f"invalid before-scripts item: {item!r}")
+
+    for node in nodes:
+        unknown = [name for name in node['needs'] if name not in names]
+        if unknown:
+            raise ValueError(f"{node['name']!r} needs unknown before-scripts: {unknown}")
+
+    done = set()
+    remaining = list(nodes)
+
+    while remaining:
+        ready = [node for node in remaining if all(name in done for name in node['needs'])]
+
+        if not ready:
+            cycle = ", ".join(node['name'] for node in remaining)
+            raise ValueError(f"before-scripts need each other in a cycle: {cycle}")
+
+        done.update(node['name'] for node in ready)
+        remaining = [node for node in remaining if node['name'] not in done]
+
+    return nodes
+
+def run_before_scripts(
+    before_scripts: Union[str, List[Any]],
+    *,
+    jobs: int = DEFAULT_SCRIPT_JOBS
+) -> List[Dict[str, Any]]:
+    """Runs ``before-scripts``, as parallel as their dependencies allow.
+
+    Output is streamed line by line, prefixed with the command name. As soon as a command
+    exits with a non-zero status, the ones still running are terminated and nothing else
+    is started.
+
+    Returns a dict per command that ran, with ``name``, ``run``, ``code`` and ``duration``.
+    The run failed if any ``code`` is non-zero (``None`` means it was terminated).
+
+    Args:
+        before_scripts (str | list): The ``before-scripts`` config (see :func:`plan_before_scripts`).
+        jobs (int, optional): The maximum amount of commands running at once.
+    """
+    from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+    nodes = plan_before_scripts(before_scripts)
+    width = max((len(node['name']) for node in nodes), default=0)
+    processes: Dict[str, subprocess.Popen] = {}
+    lock = threading.Lock()
+    aborted = threading.Event()
+
+    def execute(node: Dict[str, Any]) -> Dict[str, Any]:
+        began = time.perf_counter()
+        prefix = node['name'].ljust(width) + " | "
+
+        with lock:
+            if aborted.is_set():
+                return {**node, "code": None, "duration": 0.0}
+
+            process = subprocess.Popen(
+                node['run'],
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=1,
+                text=True,
+                errors="replace",
+                start_new_session=os.name == "posix"
+            )
+            processes[node['name']] = process
+
+        for line in process.stdout:
+            with lock:
+                sys.stdout.write(prefix + line)
+                sys.stdout.flush()
+
+        code = process.wait()
+
+        if aborted.is_set() and code != 0:
+            code = None
+
+        return {**node, "code": code, "duration": time.perf_counter() - began}
+
+    def terminate_all():
+        with lock:
+            for process in processes.values():
+                if process.poll() is not None:
+                    continue
+
+                if os.name == "posix":
+                    # the whole group, so that children of the shell stop too
+                    with suppress(ProcessLookupError):
+                        os.killpg(process.pid, signal.SIGTERM)
+                else:
+                    process.terminate()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = list(nodes)
+    running: Dict[Future, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        try:
+            while pending or running:
+                if not aborted.is_set():
+                    for node in [
+                        node for node in pending
+                        if all(name in results for name in node['needs'])
+                    ]:
+                        pending.remove(node)
+                        running[executor.submit(execute, node)] = node['name']
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    running.pop(future)
+                    result = future.result()
+                    results[result['name']] = result
+
+                    if result['code'] != 0 and not aborted.is_set():
+                        aborted.set()
+
+                        terminate_all()
+
+        except KeyboardInterrupt:
+            aborted.set()
+
+            terminate_all()
+            raise
+
+    return [results[node['name']] for node in nodes if node['name'] in results]
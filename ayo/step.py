@@ -1,21 +1,32 @@
 import os
-from typing import Any, Callable, List, Optional, Union
+import sys
+import threading
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 
-from rich.console import Console
+from .checkpoint import Checkpoints
+from .memo import Memo, memo_key
+from .trace import HOOKS, Tracer
+from .utils import LazyConsole, tof
 
-from .utils import tof
+if TYPE_CHECKING:
+    import asyncio
 
 
 TYPES = Optional[Union[str, int, float, bool]]
-console = Console()
+console = LazyConsole()
 
 class Steps:
     """Represents steps.
     
     Args:
         cache (bool, optional): Whether to cache (remember) data as completions or not, so that even if 
-            `KeyboardInterrupt` occurs, the next time when this script executes, we can get the 
+            `KeyboardInterrupt` (or a crash) occurs, the next time when this script executes, we can get the 
             previous data, and skip directly to the last step the user is on.
+        name (str, optional): What identifies this script's checkpoints. Defaults to the script path.
+        workers (int, optional): The amount of threads running independent steps (see :meth:`after`).
+        trace (str, optional): Where to write a Chrome trace of the run, with the wall time, CPU time and
+            input wait of every step. Defaults to ``AYO_TRACE``. See also :func:`ayo.trace.subscribe`.
 
     Example:
         .. code-block ::
@@ -47,25 +58,55 @@ class Steps:
         "current",
         "steps",
         "data",
-        "cache"
+        "records",
+        "dependencies",
+        "interactive",
+        "memoize",
+        "memo",
+        "workers",
+        "trace",
+        "cache",
+        "checkpoints"
     )
     current: int
     steps: List[Callable]
     data: List[Any]
+    records: Dict[int, Tuple[str, Any]]
+    dependencies: List[Tuple[int, ...]]
+    interactive: List[bool]
+    memoize: List[bool]
+    memo: Memo
+    workers: int
+    trace: Optional[str]
     cache: bool
+    checkpoints: Optional[Checkpoints]
 
-    def __init__(self, *, cache: bool = True):
+    def __init__(
+        self,
+        *,
+        cache: bool = True,
+        name: Optional[str] = None,
+        workers: int = 4,
+        trace: Optional[str] = None
+    ):
         self.current = 0
         self.steps = []
         self.data = []
+        self.records = {}
+        self.dependencies = []
+        self.interactive = []
+        self.memoize = []
+        self.memo = Memo()
+        self.workers = workers
+        self.trace = trace or os.environ.get("AYO_TRACE")
         self.cache = cache
+        self.checkpoints = Checkpoints(
+            name or os.path.abspath(sys.argv[0])
+        ) if cache else None
 
-        if cache and os.path.exists("_ayo$cache.py"):
-            cache_module = __import__("_ayo$cache")
-            completions = getattr(cache_module, "_completions", [])
-            self.data = [
-                i for i in completions if i
-            ] # noqa
+        if self.checkpoints:
+            self.records = self.checkpoints.load()
+            self.data = [self.records[i][1] for i in sorted(self.records)]
 
             if self.data:
                 console.print(
@@ -76,12 +117,42 @@ class Steps:
 
                 if not tof(yn):
                     self.data = []
+                    self.records = {}
+                    self.checkpoints.clear()
 
-    def first(self, function: Callable[..., TYPES]) -> None:
-        """Registers the very first task. Acts as a decorator.
+    def register(
+        self,
+        function: Callable,
+        dependencies: Tuple[int, ...],
+        interactive: bool,
+        memoize: bool = False
+    ) -> Callable:
+        """Registers a step.
+
+        Args:
+            function (callable): The function.
+            dependencies (tuple of int): The indexes of the steps whose results are passed to it.
+            interactive (bool): Whether it may ask for input, and so must run on the main thread.
+            memoize (bool, optional): Whether to reuse results across runs for the same input.
+        """
+        self.steps.append(function)
+        self.dependencies.append(dependencies)
+        self.interactive.append(interactive)
+        self.memoize.append(memoize)
+        return function
+
+    def first(
+        self,
+        function: Optional[Callable[..., TYPES]] = None,
+        *,
+        memoize: bool = False
+    ) -> Callable[..., TYPES]:
+        """Registers the very first task. Acts as a decorator, with or without args.
         
         Args:
             function ((...) -> str | int | float | bool): The function.
+            memoize (bool, optional): Whether to reuse the result of earlier runs with the same input
+                (see :meth:`then`).
 
         Example:
             .. code-block :: python
@@ -91,46 +162,239 @@ class Steps:
                 def first_step():
                     print("I print!")
         """
-        self.steps.append(function)
+        if function is None:
+            return lambda function: self.first(function, memoize=memoize)
+
+        return self.register(function, (), True, memoize)
 
-    def then(self, function: Callable[[TYPES], TYPES]) -> None:
-        """Register tasks after the first one. Acts as a decorator.
+    def then(
+        self,
+        function: Optional[Callable[[TYPES], TYPES]] = None,
+        *,
+        memoize: bool = False
+    ) -> Callable[[TYPES], TYPES]:
+        """Register tasks after the first one. Acts as a decorator, with or without args.
 
         Once this function is called, the data returned from the previous step will be passed as an arg.
         
         Args:
             function ((data: str | int | float | bool | None) -> str | int | float | bool | None): The function.
+            memoize (bool, optional): Whether to reuse the result of earlier runs (kept on disk, see
+                ``ayo clean-cache``) when the step and its input haven't changed. Only for deterministic steps.
+
+        Example:
+            .. code-block :: python
+
+                @steps.then(memoize=True)
+                def lockfile(manifest: str) -> str:
+                    ... # expensive, but always the same for the same manifest
         """
-        self.steps.append(function)
+        if function is None:
+            return lambda function: self.then(function, memoize=memoize)
+
+        previous = (len(self.steps) - 1,) if self.steps else ()
+        return self.register(function, previous, True, memoize)
+
+    def after(
+        self,
+        *dependencies: Callable,
+        interactive: bool = False,
+        memoize: bool = False
+    ) -> Callable[[Callable], Callable]:
+        """Registers a task that needs the results of earlier tasks. Acts as a decorator.
+
+        The results of ``dependencies`` are passed as args, in order. Tasks that don't depend
+        on each other run concurrently (on a thread pool, or on the event loop for ``async def``
+        tasks), unless they are ``interactive`` (those always run one at a time).
+
+        Args:
+            *dependencies (callable): The earlier tasks this one needs.
+            interactive (bool, optional): Whether this task asks for input.
+            memoize (bool, optional): Whether to reuse results across runs (see :meth:`then`).
+
+        Example:
+            .. code-block :: python
+
+                steps = Steps()
+
+                @steps.first
+                def ask() -> str:
+                    return input("Project name? ")
+
+                @steps.after(ask)
+                def download_assets(name: str): ...
+
+                @steps.after(ask)
+                def generate_config(name: str): ...
+
+                @steps.after(download_assets, generate_config)
+                def install(assets, config): ...
+        """
+        indexes = []
+
+        for dependency in dependencies:
+            if dependency not in self.steps:
+                raise ValueError(f"{dependency!r} is not a registered step")
+
+            indexes.append(self.steps.index(dependency))
+
+        def decorator(function: Callable) -> Callable:
+            return self.register(function, tuple(indexes), interactive, memoize)
+
+        return decorator
+
+    def restorable(self) -> Dict[int, Any]:
+        """Gets the restored results that are still valid.
+
+        A result is only reused if the step at its index has the same name, and every
+        step it depends on is reusable too.
+        """
+        results = {}
+
+        for index, function in enumerate(self.steps):
+            record = self.records.get(index)
+
+            if record and record[0] == function.__name__ \
+            and all(dependency in results for dependency in self.dependencies[index]):
+                results[index] = record[1]
+
+        return results
 
     def start(self):
-        """Starts the process."""
-        data = self.data
+        """Starts the process.
+
+        Each step is checkpointed as soon as it completes, so the next run only re-runs
+        what didn't finish, no matter how this one ends.
+
+        ``async def`` steps all run on one event loop owned by this call (in a background
+        thread), so they can fan out concurrent I/O; sync and async steps can be mixed
+        freely.
+        """
+        import inspect
+        from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
         steps = self.steps
-        collected_data = [None if i >= len(data) else data[i] for i in range(len(steps))]
-        begin = len(data)
+        results = self.restorable()
+        pending = [index for index in range(len(steps)) if index not in results]
+        running: Dict[Future, int] = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, self.workers))
+        loop: Optional["asyncio.AbstractEventLoop"] = None
+        memo_keys: Dict[int, str] = {}
+        tracer = Tracer(self.trace) if self.trace or HOOKS else None
+        functions = [
+            tracer.wrap(index, function) if tracer else function
+            for index, function in enumerate(steps)
+        ]
+
+        def memoized(index: int) -> bool:
+            if not self.memoize[index]:
+                return False
+
+            key = memo_key(
+                steps[index],
+                [results[dependency] for dependency in self.dependencies[index]]
+            )
+            if key is None:
+                return False
+
+            hit, value = self.memo.load(key)
+
+            if hit:
+                if tracer:
+                    tracer.cached(index, steps[index].__name__)
+
+                done(index, value)
+                return True
+
+            memo_keys[index] = key
+            return False
+
+        def submit(index: int) -> Future:
+            nonlocal loop
+            function = functions[index]
+            args = [results[dependency] for dependency in self.dependencies[index]]
+
+            if not inspect.iscoroutinefunction(function):
+                return executor.submit(function, *args)
+
+            import asyncio
+
+            if loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True).start()
+
+            return asyncio.run_coroutine_threadsafe(function(*args), loop)
+
+        def done(index: int, value: Any):
+            results[index] = value
+
+            if index in memo_keys:
+                self.memo.save(memo_keys.pop(index), steps[index].__name__, value)
+
+            if self.checkpoints:
+                self.checkpoints.append(index, steps[index].__name__, value)
+
+        def stop():
+            for future in running:
+                future.cancel()
+
+            executor.shutdown(wait=False, cancel_futures=True)
+
+            if loop is not None:
+                loop.call_soon_threadsafe(loop.stop)
+
+        with tracer or nullcontext():
+            try:
+                while pending or running:
+                    ready = [
+                        index for index in pending
+                        if all(dependency in results for dependency in self.dependencies[index])
+                    ]
+
+                    for index in ready:
+                        if self.interactive[index]:
+                            continue
+
+                        pending.remove(index)
+
+                        if not memoized(index):
+                            running[submit(index)] = index
+
+                    interactive = [index for index in ready if self.interactive[index]]
+
+                    if interactive and memoized(interactive[0]):
+                        pending.remove(interactive[0])
+
+                    elif interactive:
+                        index = interactive[0]
+                        pending.remove(index)
+
+                        if inspect.iscoroutinefunction(steps[index]):
+                            done(index, submit(index).result())
+                        else:
+                            done(index, functions[index](
+                                *[results[dependency] for dependency in self.dependencies[index]]
+                            ))
+
+                    elif running:
+                        finished, _ = wait(running, return_when=FIRST_COMPLETED)
 
-        try:
-            for index, f in enumerate(steps):
-                if index < begin:
-                    continue
+                        for future in sorted(finished, key=running.get):
+                            done(running.pop(future), future.result())
 
-                if index == 0:
-                    _next_data = f()
-                else:
-                    _next_data = f(collected_data[index - 1])
+                    elif not ready:
+                        raise RuntimeError("steps depend on each other in a cycle")
 
-                collected_data[index] = _next_data
+            except KeyboardInterrupt:
+                stop()
+                exit(1)
 
-        except KeyboardInterrupt:
-            if self.cache:
-                with open("_ayo$cache.py", "w", encoding="utf-8") as file:
-                    file.write("_completions=[" + ", ".join([
-                        f"{i!r}" for i in collected_data
-                    ]) + "]")
+            except BaseException:
+                stop()
+                raise
 
-            exit(1)
+        stop()
 
         # safe exit
-        if os.path.exists("_ayo$cache.py"):
-            os.remove("_ayo$cache.py")
+        if self.checkpoints:
+            self.checkpoints.clear()
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, Optional
+
+
+STORE_DIR = os.environ.get(
+    "AYO_STORE",
+    os.path.join(os.path.expanduser("~"), ".ayo", "store")
+)
+CHUNK_SIZE = 64 * 1024
+BLOB_MODE = 0o444 # blobs are hardlinked into every project; an edit in one must not change the rest
+INSTALLED_MANIFEST = ".ayo-manifest.json"
+
+def blob_hasher(size: int) -> "hashlib._Hash":
+    """Starts a git blob hash (SHA-1) of ``size`` bytes, to be fed the data as it comes.
+
+    Args:
+        size (int): The data size.
+    """
+    return hashlib.sha1(b"blob %d\0" % size)
+
+def blob_hash(data: bytes) -> str:
+    """Gets the git blob hash (SHA-1) of some bytes.
+
+    The same hash GitHub reports for tree entries, so blobs can be looked up before they
+    are ever downloaded.
+
+    Args:
+        data (bytes): The data.
+    """
+    sha = blob_hasher(len(data))
+    sha.update(data)
+    return sha.hexdigest()
+
+def blob_hash_file(path: str) -> str:
+    """Gets the git blob hash (SHA-1) of a file, reading it in chunks.
+
+    Args:
+        path (str): The file path.
+    """
+    sha = blob_hasher(os.path.getsize(path))
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+def blob_path(sha: str) -> str:
+    """Gets the path of a blob in the store.
+
+    Args:
+        sha (str): The blob hash.
+    """
+    return os.path.join(STORE_DIR, "blobs", sha[:2], sha[2:])
+
+def has_blob(sha: str, *, verify: bool = False) -> bool:
+    """Checks whether a blob is already in the store.
+
+    Args:
+        sha (str): The blob hash.
+        verify (bool, optional): Whether to also check its contents (read-only blobs can
+            still be written to by root). A blob that doesn't match is removed.
+    """
+    path = blob_path(sha)
+
+    if not os.path.exists(path):
+        return False
+
+    if verify and blob_hash_file(path) != sha:
+        os.remove(path)
+        return False
+
+    return True
+
+def temp_path() -> str:
+    """Gets a fresh temporary path inside the store.
+
+    Files downloaded here can be moved into the store with a cheap rename.
+    """
+    directory = os.path.join(STORE_DIR, "tmp")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, uuid.uuid4().hex)
+
+def add_blob_file(
+    path: str,
+    expected: Optional[str] = None,
+    *,
+    sha: Optional[str] = None
+) -> str:
+    """Moves a file into the store and returns its blob hash.
+
+    If the blob is already present, the file is simply removed.
+
+    Args:
+        path (str): The file path. The file is consumed.
+        expected (str, optional): The expected blob hash.
+        sha (str, optional): The blob hash of the file, if already computed (e.g. while
+            downloading it). Otherwise the file is hashed.
+
+    Raises:
+        ValueError: The file does not match ``expected``.
+    """
+    sha = sha or blob_hash_file(path)
+
+    if expected and sha != expected:
+        os.remove(path)
+        raise ValueError(f"blob hash mismatch: expected {expected}, got {sha}")
+
+    target = blob_path(sha)
+
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        os.chmod(path, BLOB_MODE)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+
+    return sha
+
+def add_blob(data: bytes) -> str:
+    """Adds bytes to the store and returns their blob hash.
+
+    Args:
+        data (bytes): The data.
+    """
+    sha = blob_hash(data)
+
+    if not has_blob(sha):
+        path = temp_path()
+        with open(path, "wb") as file:
+            file.write(data)
+
+        os.chmod(path, BLOB_MODE)
+        os.makedirs(os.path.dirname(blob_path(sha)), exist_ok=True)
+        os.replace(path, blob_path(sha))
+
+    return sha
+
+def link_blob(sha: str, dest: str) -> None:
+    """Materializes a blob at ``dest``.
+
+    Tries a hardlink first, then a symlink, then falls back to copying. Blobs are
+    read-only, so a linked file can't be edited in place by accident.
+
+    Args:
+        sha (str): The blob hash.
+        dest (str): The destination path.
+    """
+    source = blob_path(sha)
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+
+    if os.path.lexists(dest):
+        os.remove(dest)
+
+    try:
+        os.link(source, dest)
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(source), dest)
+        except OSError:
+            shutil.copyfile(source, dest)
+
+def manifest_path(key: str) -> str:
+    """Gets the manifest path of a script.
+
+    Args:
+        key (str): The script key, ``owner~name~branch``.
+    """
+    return os.path.join(STORE_DIR, "scripts", key + ".json")
+
+def _load_json(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def _save_json(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp" # next to it, so the rename never crosses devices
+
+    with open(tmp, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+
+    os.replace(tmp, path)
+
+def load_manifest(key: str) -> Optional[dict]:
+    """Loads the manifest of a script, if any.
+
+    A manifest looks like ``{"files": {path: blob hash}, ...}``. The store manifest is
+    the latest revision any project installed; what a project actually has is in its
+    own manifest (see :func:`load_installed`).
+
+    Args:
+        key (str): The script key, ``owner~name~branch``.
+    """
+    return _load_json(manifest_path(key))
+
+def save_manifest(key: str, manifest: dict) -> None:
+    """Saves the manifest of a script.
+
+    Args:
+        key (str): The script key, ``owner~name~branch``.
+        manifest (dict): The manifest.
+    """
+    _save_json(manifest_path(key), manifest)
+
+def load_installed(dest: str) -> Optional[dict]:
+    """Loads the manifest of the script installed into ``dest``, if any.
+
+    It records the revision and files that are actually in ``dest``, which may be older
+    than the store manifest if another project updated the script since.
+
+    Args:
+        dest (str): The script directory, like ``.ayo-scripts/owner~name~branch/``.
+    """
+    return _load_json(os.path.join(dest, INSTALLED_MANIFEST))
+
+def save_installed(dest: str, manifest: dict) -> None:
+    """Saves the manifest of the script installed into ``dest``.
+
+    Args:
+        dest (str): The script directory.
+        manifest (dict): The manifest.
+    """
+    _save_json(os.path.join(dest, INSTALLED_MANIFEST), manifest)
+
+def materialize(files: Dict[str, str], dest: str) -> bool:
+    """Links every file of a manifest into ``dest``.
+
+    Returns ``False`` without touching anything if a blob is missing from the store (or
+    doesn't match its hash anymore).
+
+    Args:
+        files (dict of str: str): Relative paths mapped to blob hashes.
+        dest (str): The destination directory.
+    """
+    if not all(has_blob(sha, verify=True) for sha in files.values()):
+        return False
+
+    for path, sha in files.items():
+        link_blob(sha, os.path.join(dest, path))
+
+    return True
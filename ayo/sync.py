@@ -0,0 +1,135 @@
+import hashlib
+import os
+import shutil
+from typing import Iterable, List, Union
+
+from .ignore import IgnoreMatcher
+
+
+STALE_MODES = ("keep", "report", "delete")
+CHUNK_SIZE = 1024 * 1024
+
+class Changes:
+    """What an install did to the project directory.
+
+    Paths are relative to the project, separated with ``/``; directories end with ``/``.
+
+    Attributes:
+        created (list of str): Files and directories that didn't exist.
+        updated (list of str): Files whose contents were different, and were rewritten.
+        unchanged (list of str): Files and directories that were already up to date, and
+            were left untouched.
+        stale (list of str): Files and directories of the project that are not in the
+            template (only looked for with ``stale="report"`` or ``stale="delete"``).
+        removed (list of str): Stale files and directories that were deleted.
+    """
+    __slots__ = (
+        "created",
+        "updated",
+        "unchanged",
+        "stale",
+        "removed"
+    )
+    created: List[str]
+    updated: List[str]
+    unchanged: List[str]
+    stale: List[str]
+    removed: List[str]
+
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.unchanged = []
+        self.stale = []
+        self.removed = []
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.updated or self.removed)
+
+    def __repr__(self) -> str:
+        return (
+            f"Changes(created={len(self.created)}, updated={len(self.updated)}, "
+            f"unchanged={len(self.unchanged)}, stale={len(self.stale)}, "
+            f"removed={len(self.removed)})"
+        )
+
+def digest(data: Union[bytes, memoryview]) -> bytes:
+    """Hashes some file contents.
+
+    Args:
+        data (bytes-like): The contents.
+    """
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def file_digest(path: str) -> bytes:
+    """Hashes the contents of a file, reading it in bounded chunks.
+
+    Args:
+        path (str): The file path.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+
+    return hasher.digest()
+
+def find_stale(
+    root: str,
+    expected: Iterable[str],
+    matcher: IgnoreMatcher
+) -> List[str]:
+    """Finds the files and directories under ``root`` that are not expected.
+
+    A directory that isn't expected is reported as a whole (and never walked). Ignored
+    paths belong to the project, and are never stale.
+
+    Args:
+        root (str): The project directory.
+        expected (iterable of str): The expected paths, relative to ``root`` and separated
+            with ``/``. Directories don't end with ``/`` here.
+        matcher (IgnoreMatcher): Paths to leave alone.
+    """
+    expected = set(expected)
+    stale = []
+
+    for directory, dirs, files in os.walk(root):
+        relroot = os.path.relpath(directory, root).replace("\\", "/")
+        relroot = "" if relroot == "." else relroot + "/"
+        kept = []
+
+        for _dir in dirs:
+            path = relroot + _dir
+
+            if matcher and matcher.matches(path, True):
+                continue
+
+            if path in expected and not os.path.islink(os.path.join(directory, _dir)):
+                kept.append(_dir)
+            elif path not in expected:
+                stale.append(path + "/")
+
+        dirs[:] = kept
+
+        for fileName in files:
+            path = relroot + fileName
+
+            if path in expected or matcher and matcher.matches(path):
+                continue
+
+            stale.append(path)
+
+    stale.sort()
+    return stale
+
+def remove_path(path: str) -> None:
+    """Removes a file, a symbolic link or a whole directory.
+
+    Args:
+        path (str): The path.
+    """
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
@@ -1,11 +1,35 @@
+import io
 import os
+import shutil
 import sys
+from contextlib import suppress
 from enum import Enum
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn
-
-from .utils import bytes_to_readable
+from .entry import (
+    DATA,
+    DIRECTORY,
+    LAZY,
+    PACK,
+    SOURCE,
+    Entry,
+    is_lazy_source,
+    resolve_source,
+    split_path,
+    write_source
+)
+from .ignore import IGNORES, IgnoreMatcher
+from .pack import EXTENSION, read_pack
+from .reporter import InstallReporter
+from .sync import STALE_MODES, Changes, digest, file_digest, find_stale, remove_path
+from .utils import bytes_to_readable, copy_file
+from .variables import (
+    MAX_RENDER_SIZE,
+    SEGMENTS,
+    compile_placeholders,
+    is_binary,
+    render_to
+)
 
 
 class then(Enum):
@@ -15,31 +39,45 @@ class Template:
     r"""Represents an ayo script template.
     
     Args:
-        contents (str | dict of str | Any): The contents.
+        contents (str | dict of str | Any): The contents: a template name, or a directory dict.
+            File contents in a directory dict can be ``str``, ``bytes``, or lazy: a callable,
+            a file-like object, a ``pathlib.Path`` or an iterable of ``bytes``/``str`` chunks.
+        ignores (dict of str: Any | iterable of str, optional): Files and directories to leave out.
+            Ignored directories of a template directory are never walked nor read.
 
     Example:
         .. code-block :: python
 
+            import pathlib
             from ayo import Template
             template = Template("my-ayo-template-dir")
+            # or from a pack made with `ayo pack my-ayo-template-dir`
+            template = Template("my-ayo-template-dir.ayopack")
             # or do it manually (with custom files & contents)
             template = Template({
                 "main.py": "with open('data/data.json') as file:\n  file.read()",
                 "README.md": "# Welcome!\nThis is my project generator.",
                 "data": {
-                    "data.json": '{\n  "happy": true\n}'
+                    "data.json": '{\n  "happy": true\n}',
+                    # lazy contents are only produced (and streamed) when installing
+                    "seed.csv": lambda: (f"{n},{n * n}\n" for n in range(10 ** 6)),
+                    "logo.png": pathlib.Path("assets/logo.png")
                 }
             })
     """
     __slots__ = (
         'contents',
     )
-    contents: List[Dict[str, str]]
+    contents: List[Entry]
 
     def __init__(
         self,
-        contents: Union[str, Dict[str, Any]]
+        contents: Union[str, Dict[str, Any]],
+        *,
+        ignores: IGNORES = None
     ):
+        matcher = IgnoreMatcher(ignores)
+
         if isinstance(contents, str):
             self.contents = []
 
@@ -50,6 +88,16 @@ class Template:
                 raise NotADirectoryError("'.ayo-templates' must be a directory.")
             
             target_directory = f".ayo-templates/{contents}"
+            pack_path = target_directory if target_directory.endswith(EXTENSION) \
+                else target_directory + EXTENSION
+
+            if not os.path.isdir(target_directory) and os.path.isfile(pack_path):
+                self.contents = [
+                    entry for entry in read_pack(pack_path)
+                    if not matcher.matches_parts(entry.parts, entry.is_dir)
+                ]
+                return
+
             if not os.path.exists(target_directory) \
             or not os.path.isdir(target_directory):
                 raise NotADirectoryError(
@@ -57,115 +105,437 @@ class Template:
                 )
             
             for root, dirs, files in os.walk(target_directory):
-                relroot = root[len(target_directory + "/"):]
+                parts = split_path(root[len(target_directory + "/"):])
+                root = os.path.abspath(root)
+
+                if matcher:
+                    dirs[:] = [
+                        _dir for _dir in dirs
+                        if not matcher.matches_parts(parts + (_dir,), True, leaf_only=True)
+                    ]
+                    files = [
+                        fileName for fileName in files
+                        if not matcher.matches_parts(parts + (fileName,), leaf_only=True)
+                    ]
+
                 for _dir in dirs:
-                    self.contents.append({
-                        "fn": f"?mk:{os.path.join(relroot, _dir)}"
-                    })
+                    self.contents.append(Entry(parts + (sys.intern(_dir),), DIRECTORY))
 
                 for fileName in files:
                     _path = os.path.join(root, fileName)
-                    with open(_path, "rb") as file:
-                        self.contents.append({
-                            "fn": os.path.join(relroot, fileName),
-                            "content": file.read()
-                        })
+                    stat = os.stat(_path)
+                    self.contents.append(Entry(
+                        parts + (sys.intern(fileName),),
+                        SOURCE,
+                        _path,
+                        stat.st_size,
+                        mode=stat.st_mode & 0o777
+                    ))
 
         elif isinstance(contents, dict):
-            self.contents = Template.convert_dict_to_list(contents)
+            self.contents = Template.convert_dict_to_list(contents, matcher=matcher)
 
     def install(
         self, 
         project_name: str, 
         *, 
-        ignores: Dict[str, Any] = {},
-        sys_argv: Optional[str] = None
-    ):
-        """Installs contents for the user from this template.
+        ignores: IGNORES = None,
+        sys_argv: Optional[str] = None,
+        workers: int = 1,
+        render: Optional[str] = None,
+        variables: Optional[Dict[str, Any]] = None,
+        sync: bool = False,
+        stale: str = "keep"
+    ) -> Changes:
+        """Installs contents for the user from this template, and returns what changed.
+
+        The directory skeleton is always created first. With ``workers`` above 1, files are
+        then written from a thread pool; if any of them fail, the error of the first failed
+        file (in template order) is raised once the rest are done.
+
+        With ``sync``, the template is applied to a project that may already exist (like
+        after a template update): existing files are compared first (size, then modification
+        time, then a content hash) and only new or changed files are written, so identical
+        files keep their modification time.
         
         Args:
             project_name (str): The project name defined by the user.
-            ignores (dict of str: str | dict of str: :obj:`Any`, optional): A directory dict representing which files 
-                and directories to exclude.
+            ignores (dict of str: str | dict of str: :obj:`Any` | iterable of str, optional): A directory 
+                dict representing which files and directories to exclude, or gitignore-style patterns.
+            workers (int, optional): The amount of threads writing files.
+            render (str, optional): How to report progress: ``verbose``, ``summary`` or ``silent``.
+                Defaults to ``verbose`` on terminals and ``summary`` otherwise.
+            variables (dict of str: Any, optional): Values for ``{{ name }}`` placeholders in text files.
+                Placeholders are left alone if not given.
+            sync (bool, optional): Whether to update an existing project in place, writing only
+                what changed.
+            stale (str, optional): What to do with project files that are not in the template:
+                ``keep`` them (without looking), ``report`` them, or ``delete`` them. Ignored
+                paths are never stale.
+
+        Raises:
+            FileExistsError: The project already exists (and ``sync`` is off).
+            ValueError: Unknown ``stale`` mode.
         """
+        if stale not in STALE_MODES:
+            raise ValueError(f"Unknown stale mode {stale!r}, expected one of {STALE_MODES}")
+
         root: str = (sys_argv or sys.argv[1]) + (
             project_name if project_name.endswith(("/", "\\")) else (project_name + "/")
         )
 
-        if project_name != ".":
+        if project_name != "." and not (sync and os.path.isdir(root)):
             if os.path.exists(project_name):
                 raise FileExistsError(f"Directory or file already exists: {project_name!r}")
             
             os.mkdir(root)
 
-        ignores = Template.convert_dict_to_list(ignores)
-
-        with Progress(
-            SpinnerColumn(),
-            *Progress.get_default_columns(),
-            TimeElapsedColumn(),
-        ) as progress:
-            task = progress.add_task("[green]Creating new project...", total=len(self.contents))
-
-            for content in self.contents:
-                if any(
-                    content['fn'].startswith(item['fn']) \
-                    or content['fn'].startswith(item['fn'][len("?mk:"):]) \
-                    for item in ignores
-                ):
-                    progress.update(task, advance=1)
-                    ignored = (root + content['fn']).replace("\\", "/")
-                    progress.log(
-                        f"[d white](ignored cmd {ignored})[/d white]"
-                    )
+        matcher = IgnoreMatcher(ignores)
+        changes = Changes()
+
+        with InstallReporter(
+            len(self.contents),
+            render=render,
+            description="[green]Syncing project..." if sync else "[green]Creating new project...",
+            changes=changes if sync else None
+        ) as reporter:
+            files = []
+            expected = []
+
+            for entry in self.contents:
+                if matcher and matcher.matches_parts(entry.parts, entry.is_dir):
+                    reporter.advance()
+                    if reporter.verbose:
+                        ignored = (root + entry.path).replace("\\", "/")
+                        reporter.log(
+                            f"[d white](ignored cmd {ignored})[/d white]"
+                        )
                     continue
 
-                if content['fn'].startswith("?mk:"):
-                    directory: str = content['fn'][len('?mk:'):]
-                    os.mkdir(root + directory)
-                    readable_dir = (root + directory).replace("\\", "/")
-                    progress.log(
+                path = entry.path
+
+                if stale != "keep":
+                    expected.append(path)
+
+                if entry.kind != DIRECTORY:
+                    files.append(entry)
+                    continue
+
+                if sync and os.path.isdir(root + path):
+                    changes.unchanged.append(path + "/")
+                    reporter.advance()
+                    continue
+
+                os.mkdir(root + path)
+                changes.created.append(path + "/")
+                if reporter.verbose:
+                    readable_dir = (root + path).replace("\\", "/")
+                    reporter.log(
                         f":sparkles: Created directory: {readable_dir!r}"
                     )
+                reporter.directory()
+
+            def apply(entry: Entry) -> Tuple[str, int]:
+                if sync and entry.kind == LAZY:
+                    return Template.sync_lazy_entry(root, entry)
 
-                else:
-                    with open(root + content['fn'], "wb") as file:
-                        file.write(content['content'])
+                status = Template.compare_entry(root, entry, variables) if sync else "created"
 
-                    bytes_string = bytes_to_readable(len(content['content']))
-                    readable_fn = (root + content['fn']).replace("\\", "/")
-                    progress.log(
-                        f"👉 Created & edited {readable_fn} [d white]({bytes_string})[/d white]"
+                if status == "unchanged":
+                    return status, 0
+
+                return status, Template.write_entry(root, entry, variables)
+
+            def written(entry: Entry, status: str, size: int):
+                path = entry.path
+                getattr(changes, status).append(path)
+
+                if status == "unchanged":
+                    reporter.advance()
+                    if reporter.verbose:
+                        readable_fn = (root + path).replace("\\", "/")
+                        reporter.log(f"[d white](unchanged {readable_fn})[/d white]")
+                    return
+
+                if reporter.verbose:
+                    bytes_string = bytes_to_readable(size)
+                    readable_fn = (root + path).replace("\\", "/")
+                    action = "Created & edited" if status == "created" else "Updated"
+                    reporter.log(
+                        f"👉 {action} {readable_fn} [d white]({bytes_string})[/d white]"
                     )
+                reporter.advance(size)
+
+            if workers <= 1:
+                for entry in files:
+                    written(entry, *apply(entry))
+
+            else:
+                from concurrent.futures import ThreadPoolExecutor, as_completed
+
+                errors = {}
+
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = {
+                        executor.submit(apply, entry): index
+                        for index, entry in enumerate(files)
+                    }
+
+                    for future in as_completed(futures):
+                        index = futures[future]
+
+                        try:
+                            status, size = future.result()
+                        except Exception as err: # noqa
+                            errors[index] = err
+                            reporter.advance()
+                        else:
+                            written(files[index], status, size)
+
+                if errors:
+                    raise errors[min(errors)]
+
+            if stale != "keep":
+                changes.stale = find_stale(root, expected, matcher)
+
+                for path in changes.stale:
+                    if stale == "delete":
+                        remove_path(root + path)
+                        changes.removed.append(path)
+
+                    if reporter.verbose:
+                        readable_path = (root + path).replace("\\", "/")
+                        action = "Removed stale" if stale == "delete" else "Stale (not in template):"
+                        reporter.log(f"🧹 {action} {readable_path}")
+
+        return changes
+
+    @staticmethod
+    def write_entry(
+        root: str,
+        entry: Entry,
+        variables: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Writes a file entry under ``root`` and returns its size.
+
+        With ``variables``, ``{{ name }}`` placeholders in text files are rendered; binary
+        and large files are copied untouched, and so are lazy contents, which are streamed.
+        """
+        path = root + entry.path
+        segments = Template.entry_placeholders(entry, variables)
+
+        if segments is not None:
+            with open(path, "wb") as file:
+                size = render_to(file, segments, variables)
+
+            if entry.mode is not None:
+                os.chmod(path, entry.mode)
+
+            return size
+
+        if entry.kind == PACK:
+            with open(path, "wb") as file:
+                file.write(memoryview(entry.data)[entry.offset:entry.offset + entry.size])
+
+            os.chmod(path, entry.mode)
+            return entry.size
+
+        if entry.kind == SOURCE:
+            copy_file(entry.data, path)
+            os.chmod(path, entry.mode)
+            return entry.size
+
+        if entry.kind == LAZY:
+            return Template.write_lazy(path, entry.data)
+
+        with open(path, "wb") as file:
+            file.write(entry.data)
+
+        return entry.size
+
+    @staticmethod
+    def entry_placeholders(
+        entry: Entry,
+        variables: Optional[Dict[str, Any]] = None
+    ) -> Optional[SEGMENTS]:
+        """Gets the compiled placeholders of a file entry, or ``None`` if it's written as is."""
+        if variables is None or entry.kind == LAZY or entry.size > MAX_RENDER_SIZE:
+            return None
+
+        data = Template.read_entry(entry)
+
+        if b"{{" not in data or is_binary(data):
+            return None
 
-                progress.update(task, advance=1)
+        return compile_placeholders(data)
+
+    @staticmethod
+    def compare_entry(
+        root: str,
+        entry: Entry,
+        variables: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Compares a file entry with what's already written under ``root``.
+
+        Returns ``created`` if there's nothing there yet, ``unchanged`` if it's identical,
+        and ``updated`` otherwise. Sizes are compared first, then modification times (files
+        copied from a template directory with their times kept are taken as identical), and
+        contents are only hashed when neither tells.
+        """
+        path = root + entry.path
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return "created"
+
+        segments = Template.entry_placeholders(entry, variables)
+
+        if segments is not None:
+            buffer = io.BytesIO()
+            render_to(buffer, segments, variables)
+            data = buffer.getbuffer()
+
+            if stat.st_size == len(data) and file_digest(path) == digest(data):
+                return "unchanged"
+
+            return "updated"
+
+        if stat.st_size != entry.size:
+            return "updated"
+
+        if entry.kind == SOURCE:
+            if os.stat(entry.data).st_mtime_ns == stat.st_mtime_ns:
+                return "unchanged"
+
+            same = file_digest(entry.data) == file_digest(path)
+
+        elif entry.kind == PACK:
+            view = memoryview(entry.data)[entry.offset:entry.offset + entry.size]
+            same = file_digest(path) == digest(view)
+
+        else:
+            same = file_digest(path) == digest(entry.data)
+
+        return "unchanged" if same else "updated"
+
+    @staticmethod
+    def write_lazy(path: str, source: Any) -> int:
+        """Streams lazy contents into a file and returns its size.
+
+        Args:
+            path (str): The file path.
+            source (Any): The lazy source (see :func:`ayo.entry.is_lazy_source`).
+        """
+        source = resolve_source(source)
+
+        if isinstance(source, os.PathLike):
+            copy_file(os.fspath(source), path)
+            return os.path.getsize(path)
+
+        with open(path, "wb") as file:
+            return write_source(file, source)
+
+    @staticmethod
+    def sync_lazy_entry(root: str, entry: Entry) -> Tuple[str, int]:
+        """Writes a lazy entry under ``root`` only if it changed, like :meth:`compare_entry`.
+
+        Lazy contents can only be produced once, so they're streamed next to the existing
+        file first, and replace it only if they're different. Returns the status and size.
+        """
+        path = root + entry.path
+
+        if not os.path.exists(path):
+            return "created", Template.write_lazy(path, entry.data)
+
+        tmp = path + ".ayo-tmp"
+
+        try:
+            size = Template.write_lazy(tmp, entry.data)
+
+            if size == os.path.getsize(path) and file_digest(tmp) == file_digest(path):
+                os.remove(tmp)
+                return "unchanged", 0
+
+            shutil.copymode(path, tmp)
+            os.replace(tmp, path)
+
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+
+        return "updated", size
+
+    @staticmethod
+    def read_entry(entry: Entry) -> bytes:
+        """Reads the bytes of a file entry."""
+        if entry.kind == PACK:
+            return entry.data[entry.offset:entry.offset + entry.size]
+
+        if entry.kind == SOURCE:
+            with open(entry.data, "rb") as file:
+                return file.read()
+
+        return entry.data
 
     @staticmethod
     def convert_dict_to_list(
         data: Dict[str, Any],
-        prefix: str = "", 
-        result: Optional[list] = None
-    ) -> List[Dict[str, str]]:
-        """Converts a directory dictionary to valid contents data."""
+        parts: Tuple[str, ...] = (),
+        result: Optional[List[Entry]] = None,
+        bodies: Optional[Dict[str, bytes]] = None,
+        *,
+        matcher: Optional[IgnoreMatcher] = None
+    ) -> List[Entry]:
+        """Converts a directory dictionary to template entries.
+
+        Identical file bodies are encoded once, and share the same bytes. Ignored
+        directories are skipped without being converted. Lazy contents (callables, file
+        objects, paths and iterables of chunks) are kept as they are, until written.
+
+        Args:
+            data (dict of str: Any): The directory dict.
+            parts (tuple of str, optional): The path components of the dict.
+            result (list of Entry, optional): The list to add the entries to.
+            bodies (dict of str: bytes, optional): File bodies already encoded.
+            matcher (IgnoreMatcher, optional): Paths to leave out.
+        """
         if result is None:
             result = []
 
+        if bodies is None:
+            bodies = {}
+
         for key, value in data.items():
-            if isinstance(value, str):
-                result.append({
-                    "fn": prefix + key,
-                    "content": bytes(value, encoding="utf-8")
-                })
-
-            elif isinstance(value, dict):
-                result.append({
-                    "fn": f"?mk:{prefix}{key}"
-                })
-                Template.convert_dict_to_list(value, prefix + key + "/", result)
-
-            elif value == Ellipsis:
-                result.append({
-                    "fn": f"?mk:{prefix}{key}"
-                })
+            is_dir = isinstance(value, dict) or value is Ellipsis
+
+            if not is_dir and not isinstance(value, (str, bytes)) and not is_lazy_source(value):
+                continue
+
+            entry_parts = parts + (sys.intern(key),)
+
+            if matcher and matcher.matches_parts(entry_parts, is_dir, leaf_only=True):
+                continue
+
+            if is_dir:
+                result.append(Entry(entry_parts, DIRECTORY))
+
+                if value is not Ellipsis:
+                    Template.convert_dict_to_list(value, entry_parts, result, bodies, matcher=matcher)
+
+                continue
+
+            if not isinstance(value, (str, bytes)):
+                result.append(Entry(entry_parts, LAZY, value))
+                continue
+
+            body = bodies.get(value)
+
+            if body is None:
+                body = bodies[value] = value if isinstance(value, bytes) \
+                    else bytes(value, encoding="utf-8")
+
+            result.append(Entry(entry_parts, DATA, body, len(body)))
 
         return result
@@ -0,0 +1,209 @@
+import builtins
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+HOOKS: List[Callable[[Dict[str, Any]], None]] = []
+
+def subscribe(hook: Callable[[Dict[str, Any]], None]) -> Callable[[Dict[str, Any]], None]:
+    """Subscribes to step events of every :class:`Steps` run. Can be used as a decorator.
+
+    Each event is a dict with ``name``, ``index``, ``start`` (seconds since the run started),
+    ``wall``, ``cpu`` (``None`` for async steps), ``input_wait``, ``thread`` and ``cached``.
+
+    Args:
+        hook ((event: dict) -> None): The hook.
+    """
+    HOOKS.append(hook)
+    return hook
+
+def unsubscribe(hook: Callable[[Dict[str, Any]], None]) -> None:
+    """Unsubscribes a hook.
+
+    Args:
+        hook ((event: dict) -> None): The hook.
+    """
+    HOOKS.remove(hook)
+
+class Tracer:
+    """Records the wall time, CPU time and input wait of every step in a run.
+
+    While active, ``input()`` is timed so that time spent waiting for the user is
+    reported separately. Events go to :data:`HOOKS` as they happen, and can be written
+    as a Chrome trace (``chrome://tracing``, Perfetto) when the run ends.
+
+    Args:
+        path (str, optional): Where to write the Chrome trace.
+    """
+    __slots__ = (
+        "path",
+        "events",
+        "inputs",
+        "started",
+        "local",
+        "lock",
+        "original_input"
+    )
+    path: Optional[str]
+    events: List[Dict[str, Any]]
+    inputs: List[Dict[str, Any]]
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.events = []
+        self.inputs = []
+        self.started = 0.0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.original_input = None
+
+    def __enter__(self) -> "Tracer":
+        self.started = time.perf_counter()
+        self.original_input = builtins.input
+        original_input = self.original_input
+
+        @functools.wraps(original_input)
+        def timed_input(*args, **kwargs):
+            began = time.perf_counter()
+
+            try:
+                return original_input(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - began
+                self.local.input_wait = getattr(self.local, "input_wait", 0.0) + elapsed
+
+                with self.lock:
+                    self.inputs.append({
+                        "start": began - self.started,
+                        "wall": elapsed,
+                        "thread": threading.get_ident()
+                    })
+
+        builtins.input = timed_input
+        return self
+
+    def __exit__(self, *args) -> None:
+        builtins.input = self.original_input
+
+        if self.path:
+            self.save(self.path)
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """Records an event and passes it to every hook.
+
+        Args:
+            event (dict): The event.
+        """
+        with self.lock:
+            self.events.append(event)
+
+        for hook in list(HOOKS):
+            hook(event)
+
+    def cached(self, index: int, name: str) -> None:
+        """Records a step whose result came from the memoization cache.
+
+        Args:
+            index (int): The step index.
+            name (str): The step name.
+        """
+        self.emit({
+            "name": name,
+            "index": index,
+            "start": time.perf_counter() - self.started,
+            "wall": 0.0,
+            "cpu": 0.0,
+            "input_wait": 0.0,
+            "thread": threading.get_ident(),
+            "cached": True
+        })
+
+    def wrap(self, index: int, function: Callable) -> Callable:
+        """Wraps a step so that calling it records an event.
+
+        Args:
+            index (int): The step index.
+            function (callable): The step.
+        """
+        import inspect
+
+        def record(began: float, cpu: Optional[float], input_wait: float):
+            self.emit({
+                "name": function.__name__,
+                "index": index,
+                "start": began - self.started,
+                "wall": time.perf_counter() - began,
+                "cpu": cpu,
+                "input_wait": input_wait,
+                "thread": threading.get_ident(),
+                "cached": False
+            })
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def traced_coroutine(*args):
+                began = time.perf_counter()
+
+                try:
+                    return await function(*args)
+                finally:
+                    record(began, None, 0.0)
+
+            return traced_coroutine
+
+        @functools.wraps(function)
+        def traced(*args):
+            began = time.perf_counter()
+            cpu = time.thread_time()
+            self.local.input_wait = 0.0
+
+            try:
+                return function(*args)
+            finally:
+                record(began, time.thread_time() - cpu, self.local.input_wait)
+
+        return traced
+
+    def save(self, path: str) -> None:
+        """Writes the recorded events as a Chrome trace.
+
+        Args:
+            path (str): The output path.
+        """
+        pid = os.getpid()
+        trace_events = []
+
+        for event in self.events:
+            trace_events.append({
+                "name": event['name'],
+                "cat": "step",
+                "ph": "X",
+                "ts": event['start'] * 1e6,
+                "dur": event['wall'] * 1e6,
+                "pid": pid,
+                "tid": event['thread'],
+                "args": {
+                    "index": event['index'],
+                    "cpu": event['cpu'],
+                    "input_wait": event['input_wait'],
+                    "cached": event['cached']
+                }
+            })
+
+        for wait in self.inputs:
+            trace_events.append({
+                "name": "input",
+                "cat": "input",
+                "ph": "X",
+                "ts": wait['start'] * 1e6,
+                "dur": wait['wall'] * 1e6,
+                "pid": pid,
+                "tid": wait['thread']
+            })
+
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
@@ -1,4 +1,37 @@
+import os
 import random
+import shutil
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+SELF_REMOVE_STATUS = -77034
+SELF_REMOVE_ENV = "AYO_SELF_REMOVE"
+
+class LazyConsole:
+    """Stands in for a ``rich.console.Console``, which is only created (and ``rich`` only
+    imported) the first time it's used, so that importing ayo stays fast.
+    """
+    __slots__ = (
+        "_console",
+    )
+
+    def __init__(self):
+        self._console = None
+
+    def load(self) -> "Console":
+        """Gets the actual console, creating it if needed."""
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+
+        return self._console
+
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
 
 def bytes_to_readable(count) -> str:
     """Converts bytes to a human readable string.
@@ -17,6 +50,28 @@ def bytes_to_readable(count) -> str:
     else:
         return f"{count / (1024 ** 4):.2f} TB"
 
+def copy_file(source: str, dest: str) -> None:
+    """Copies a file in bounded chunks, letting the kernel do the copying where possible.
+
+    Uses ``os.copy_file_range`` when available, and falls back to ``shutil.copyfile``
+    (which uses ``sendfile`` or ``fcopyfile`` where it can).
+
+    Args:
+        source (str): The source path.
+        dest (str): The destination path.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(source, "rb") as src, open(dest, "wb") as dst:
+                while os.copy_file_range(src.fileno(), dst.fileno(), COPY_CHUNK_SIZE):
+                    pass
+
+            return
+
+        except OSError:
+            pass
+
+    shutil.copyfile(source, dest)
 
 def true_or_false(_input: str, *, false_if_unknown: bool = True) -> bool:
     """Checks whether the input provided by the user (Yn) is true or not.
@@ -70,5 +125,15 @@ def random_fact() -> str:
     ])
 
 def self_remove() -> None:
-    """Tells ayo to remove this script."""
-    exit(-77034)
+    """Tells ayo to remove this script, and exits.
+
+    ayo gives the script a marker path in ``AYO_SELF_REMOVE``; creating it is what asks
+    for the removal, so an exit status (which any script may return) never does.
+    """
+    marker = os.environ.get(SELF_REMOVE_ENV)
+
+    if marker:
+        with open(marker, "w"):
+            pass
+
+    exit(SELF_REMOVE_STATUS)
@@ -0,0 +1,87 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Tuple, Union
+
+
+PLACEHOLDER = re.compile(rb"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+MAX_RENDER_SIZE = 8 * 1024 * 1024
+CACHE_SIZE = 4096
+
+# literal bytes, or (variable name, placeholder as written)
+SEGMENTS = Tuple[Union[bytes, Tuple[str, bytes]], ...]
+
+_compiled: "OrderedDict[bytes, SEGMENTS]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+def is_binary(data: bytes) -> bool:
+    """Checks whether some file contents look binary (a NUL byte in the first 8 KB).
+
+    Args:
+        data (bytes): The contents.
+    """
+    return b"\0" in data[:8192]
+
+def compile_placeholders(data: bytes) -> SEGMENTS:
+    """Compiles file contents into segments of literal bytes and placeholders.
+
+    Results are cached by content hash, so rendering the same template into many
+    projects compiles each file only once.
+
+    Args:
+        data (bytes): The contents.
+    """
+    key = hashlib.blake2b(data, digest_size=16).digest()
+
+    with _compiled_lock:
+        segments = _compiled.get(key)
+
+        if segments is not None:
+            _compiled.move_to_end(key)
+            return segments
+
+    result = []
+    position = 0
+
+    for match in PLACEHOLDER.finditer(data):
+        if match.start() > position:
+            result.append(data[position:match.start()])
+
+        result.append((match.group(1).decode("ascii"), match.group(0)))
+        position = match.end()
+
+    if position < len(data):
+        result.append(data[position:])
+
+    segments = tuple(result)
+
+    with _compiled_lock:
+        _compiled[key] = segments
+        if len(_compiled) > CACHE_SIZE:
+            _compiled.popitem(last=False)
+
+    return segments
+
+def render_to(file: BinaryIO, segments: SEGMENTS, variables: Dict[str, Any]) -> int:
+    """Streams compiled segments into a file and returns the amount of bytes written.
+
+    Placeholders of unknown variables are written back untouched, so files using
+    ``{{ }}`` for something else (Jinja, Vue, ...) survive.
+
+    Args:
+        file (binary file): The output file.
+        segments (tuple of bytes | (str, bytes)): The compiled segments.
+        variables (dict of str: Any): The variables.
+    """
+    written = 0
+
+    for segment in segments:
+        if isinstance(segment, tuple):
+            name, placeholder = segment
+            segment = bytes(str(variables[name]), encoding="utf-8") \
+                if name in variables else placeholder
+
+        written += file.write(segment)
+
+    return written
@@ -0,0 +1,119 @@
+"""Compares the memory and time of template contents: entries vs the old dict-per-entry list.
+
+Both sides convert the same directory dict and drop the same ignored paths; the old side
+uses the previous conversion and ``startswith`` scan, the new one ``Template(...).contents``.
+
+Run from the repository root:
+
+    python benchmarks/contents.py [files]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ayo import Template
+
+
+# the old scan only understood directory dicts, and matched them as path prefixes
+IGNORES = {"package_1": ..., "build": ...}
+
+def synthetic(files: int) -> Dict[str, Any]:
+    """Builds a directory dict with ``files`` files, 100 per directory, two levels deep.
+
+    Most bodies repeat (like generated boilerplate); one in ten is unique.
+    """
+    shared = [f"# generated module {index}\n" * 20 for index in range(8)]
+    tree = {}
+
+    for index in range(files):
+        package = tree.setdefault(f"package_{index // 10000}", {})
+        module = package.setdefault(f"module_{index // 100 % 100}", {"__cache__": ...})
+        module[f"file_{index % 100}.py"] = shared[index % 8] if index % 10 \
+            else f"VALUE = {index}\n" * 20
+
+    return tree
+
+def legacy_convert(data: Dict[str, Any], prefix: str = "", result: list = None) -> List[dict]:
+    """The previous ``Template.convert_dict_to_list``."""
+    if result is None:
+        result = []
+
+    for key, value in data.items():
+        if isinstance(value, str):
+            result.append({"fn": prefix + key, "content": bytes(value, encoding="utf-8")})
+
+        elif isinstance(value, dict):
+            result.append({"fn": f"?mk:{prefix}{key}"})
+            legacy_convert(value, prefix + key + "/", result)
+
+        elif value == Ellipsis:
+            result.append({"fn": f"?mk:{prefix}{key}"})
+
+    return result
+
+def legacy_filter(contents: List[dict], ignores: Dict[str, Any]) -> List[dict]:
+    """The previous ignore pass of ``Template.install``, without the writing."""
+    ignores = legacy_convert(ignores)
+
+    return [
+        content for content in contents
+        if not any(
+            content['fn'].startswith(item['fn'])
+            or content['fn'].startswith(item['fn'][len("?mk:"):])
+            for item in ignores
+        )
+    ]
+
+def measure(build) -> tuple:
+    """Runs ``build`` and returns its result, the seconds it took and the bytes it retained."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = synthetic(files)
+
+    # tracemalloc slows both down alike; timings are taken without it too
+    old, _, old_memory = measure(
+        lambda: legacy_filter(legacy_convert(data), IGNORES)
+    )
+    kept = len(old)
+    del old
+    new, _, new_memory = measure(lambda: Template(data, ignores=IGNORES).contents)
+    entries = len(new)
+    del new
+    assert kept == entries, (kept, entries)
+
+    timings = {}
+    for name, build in (
+        ("dicts", lambda: legacy_filter(legacy_convert(data), IGNORES)),
+        ("entries", lambda: Template(data, ignores=IGNORES).contents)
+    ):
+        best = float("inf")
+
+        for _ in range(3):
+            gc.collect()
+            started = time.perf_counter()
+            build()
+            best = min(best, time.perf_counter() - started)
+
+        timings[name] = best
+
+    print(f"{entries} entries ({files} files)")
+    print(f"{'':10}{'memory':>12}{'time':>12}")
+    print(f"{'dicts':10}{old_memory / 1024 ** 2:>10.1f}MB{timings['dicts'] * 1000:>10.0f}ms")
+    print(f"{'entries':10}{new_memory / 1024 ** 2:>10.1f}MB{timings['entries'] * 1000:>10.0f}ms")
+
+if __name__ == "__main__":
+    main()
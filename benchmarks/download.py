@@ -0,0 +1,76 @@
+"""Compares downloading script files one at a time vs concurrently.
+
+Files are served by a local threaded HTTP server that sleeps on every request, standing
+in for the round trip to GitHub. Run from the repository root:
+
+    python benchmarks/download.py [files] [latency_ms] [jobs]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ayo.download import download_files
+from ayo.store import blob_hasher
+
+
+BODY = b"# generated module\n" * 200
+
+def serve(latency: float) -> ThreadingHTTPServer:
+    """Starts a keep-alive server answering every ``GET`` with ``BODY`` after ``latency`` seconds."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run(base: str, files: int, jobs: int) -> float:
+    """Downloads ``files`` files with ``jobs`` workers and returns the seconds it took."""
+    with tempfile.TemporaryDirectory() as directory:
+        items = [(f"{base}/file_{index}.py", os.path.join(directory, f"file_{index}.py"))
+                 for index in range(files)]
+        started = time.perf_counter()
+
+        for url, _, status, _ in download_files(items, jobs=jobs, hasher=blob_hasher):
+            if status != 200:
+                raise RuntimeError(f"{url}: status {status}")
+
+        return time.perf_counter() - started
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    jobs = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    server = serve(latency)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        run(base, min(files, jobs), jobs) # warm up the connection pool
+        timings = {count: run(base, files, count) for count in (1, jobs)}
+    finally:
+        server.shutdown()
+
+    print(f"{files} files, {latency * 1000:.0f}ms per request")
+    print(f"{'':10}{'time':>12}{'files/s':>12}")
+    for count, elapsed in timings.items():
+        print(f"{f'--jobs={count}':10}{elapsed * 1000:>10.0f}ms{files / elapsed:>12.1f}")
+
+if __name__ == "__main__":
+    main()
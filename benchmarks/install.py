@@ -0,0 +1,61 @@
+"""Compares the install throughput of a large template with one writer thread vs several.
+
+The template is the synthetic tree of ``contents.py``, installed from memory (a directory
+dict) and from disk (``.ayo-templates``). Run from the repository root:
+
+    python benchmarks/install.py [files] [workers]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ayo import Template
+from contents import synthetic
+
+
+def run(template: Template, workers: int) -> float:
+    """Installs ``template`` into a fresh project and returns the best of 3, in seconds."""
+    best = float("inf")
+
+    for attempt in range(3):
+        project = f"app-{workers}-{attempt}"
+        started = time.perf_counter()
+        template.install(project, sys_argv="./", workers=workers, render="silent")
+        best = min(best, time.perf_counter() - started)
+        shutil.rmtree(project)
+
+    return best
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else min(32, (os.cpu_count() or 1) * 4)
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+
+        try:
+            data = synthetic(files)
+            os.mkdir(".ayo-templates")
+            Template(data).install(".ayo-templates/synthetic", sys_argv="./", render="silent")
+            templates = {"dict": Template(data), "directory": Template("synthetic")}
+            timings = {
+                (name, count): run(template, count)
+                for name, template in templates.items()
+                for count in (1, workers)
+            }
+        finally:
+            os.chdir(cwd)
+
+    print(f"{files} files, files written per second")
+    print(f"{'':14}{'dict':>12}{'directory':>12}")
+    for count in (1, workers):
+        row = "".join(f"{files / timings[name, count]:>10.0f}/s" for name in templates)
+        print(f"{f'workers={count}':14}{row}")
+
+if __name__ == "__main__":
+    main()
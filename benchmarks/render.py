@@ -0,0 +1,59 @@
+"""Compares the overhead of the install render modes: verbose, summary and silent.
+
+Output goes to a terminal console writing to ``os.devnull``, so that rendering costs what
+it would on a real terminal without flooding it. Run from the repository root:
+
+    python benchmarks/render.py [files]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rich.console import Console
+
+from ayo import Template, reporter
+from ayo.reporter import RENDER_MODES
+from contents import synthetic
+
+
+def run(template: Template, render: str, attempt: int) -> float:
+    """Installs ``template`` into a fresh project and returns the seconds it took."""
+    project = f"app-{render}-{attempt}"
+    started = time.perf_counter()
+    template.install(project, sys_argv="./", render=render)
+    elapsed = time.perf_counter() - started
+    shutil.rmtree(project)
+    return elapsed
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    template = Template(synthetic(files))
+    cwd = os.getcwd()
+
+    with open(os.devnull, "w") as devnull, tempfile.TemporaryDirectory() as directory:
+        reporter.console._console = Console(file=devnull, force_terminal=True, width=120)
+        os.chdir(directory)
+
+        try:
+            timings = dict.fromkeys(RENDER_MODES, float("inf"))
+
+            # interleaved, so that the disk warming up doesn't favour the later modes
+            for attempt in range(3):
+                for render in RENDER_MODES:
+                    timings[render] = min(timings[render], run(template, render, attempt))
+        finally:
+            os.chdir(cwd)
+            reporter.console._console = None
+
+    print(f"{len(template.contents)} entries ({files} files)")
+    print(f"{'':10}{'time':>12}{'overhead':>12}")
+    for render, elapsed in timings.items():
+        overhead = elapsed - timings['silent']
+        print(f"{render:10}{elapsed * 1000:>10.0f}ms{overhead * 1000:>10.0f}ms")
+
+if __name__ == "__main__":
+    main()
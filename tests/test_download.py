@@ -0,0 +1,133 @@
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ayo import download
+from ayo.store import blob_hash, blob_hasher
+
+
+DATA = os.urandom(200 * 1024 + 17)
+
+class Handler(BaseHTTPRequestHandler):
+    """Answers each request according to the next step of the server's plan.
+
+    - ``ok``: the file, honouring ``Range``.
+    - ``ignore-range``: the whole file with ``200``, whatever was asked for.
+    - ``truncate``: announces the whole (remaining) file, but only sends a third of it.
+    - ``503``: service unavailable.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        step = self.server.plan.pop(0) if self.server.plan else "ok"
+        requested = self.headers.get("Range")
+        self.server.ranges.append(requested)
+
+        if step == "503":
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = 0
+        if requested and step != "ignore-range":
+            start = int(re.match(r"bytes=(\d+)-", requested).group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(DATA) - 1}/{len(DATA)}")
+        else:
+            self.send_response(200)
+
+        body = DATA[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if step == "truncate":
+            self.wfile.write(body[:len(body) // 3])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(download, "BACKOFF", 0)
+    monkeypatch.setattr(download, "_offline", False)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.plan = []
+    server.ranges = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+def fetch(server, tmp_path, plan, **kwargs):
+    server.plan = list(plan)
+    path = str(tmp_path / "file.bin")
+    status, digest = download.download_file(server.url, path, hasher=blob_hasher, **kwargs)
+    return path, status, digest
+
+def read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+def resumed_from(requested):
+    """Gets the offset of a ``Range`` header; the part kept can end before the cut."""
+    offset = int(re.fullmatch(r"bytes=(\d+)-", requested).group(1))
+    assert 0 < offset <= len(DATA) // 3
+    return offset
+
+def test_resumes_truncated_download(server, tmp_path):
+    path, status, digest = fetch(server, tmp_path, ["truncate", "ok"])
+
+    assert status == 200
+    assert read(path) == DATA
+    assert len(server.ranges) == 2 and server.ranges[0] is None
+    resumed_from(server.ranges[1])
+    assert digest == blob_hash(DATA)
+    assert not os.path.exists(path + ".part")
+
+def test_retries_unavailable_server(server, tmp_path):
+    path, status, digest = fetch(server, tmp_path, ["503", "503", "ok"])
+
+    assert status == 200
+    assert read(path) == DATA
+    assert server.ranges == [None, None, None]
+    assert digest == blob_hash(DATA)
+
+def test_restarts_when_range_is_ignored(server, tmp_path):
+    path, status, digest = fetch(server, tmp_path, ["truncate", "ignore-range"])
+
+    assert status == 200
+    assert read(path) == DATA
+    resumed_from(server.ranges[1])
+    assert digest == blob_hash(DATA)
+
+def test_gives_up_after_retries(server, tmp_path):
+    path, status, digest = fetch(server, tmp_path, ["503"] * 3, retries=2)
+
+    assert (status, digest) == (503, None)
+    assert len(server.ranges) == 3
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".part")
+
+def test_streamed_digest(server, tmp_path):
+    path, status, digest = fetch(server, tmp_path, ["ok"])
+
+    assert status == 200
+    assert digest == blob_hash(DATA)
+
+    server.plan = ["ok"]
+    assert download.download_file(server.url, path) == (200, None)
+    assert read(path) == DATA
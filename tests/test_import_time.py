@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# microseconds, as reported by `python -X importtime`; generous so that slow CI machines
+# don't flake, but far below what importing rich & requests eagerly costs
+IMPORT_BUDGET = 100_000
+LAZY_MODULES = ("rich", "requests")
+
+def import_ayo(module: str):
+    """Imports a module in a fresh interpreter.
+
+    Returns the cumulative import time of the module (in microseconds) and the heavy
+    modules that were imported along with it.
+
+    Args:
+        module (str): The module to import.
+    """
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(name for name in {LAZY_MODULES!r} if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    total = None
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+
+        # top-level imports aren't indented
+        if len(parts) == 3 and parts[2].rstrip() == f" {module}":
+            total = int(parts[1])
+
+    assert total is not None, result.stderr
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return total, loaded
+
+@pytest.mark.parametrize("module", ["ayo", "ayo.cli"])
+def test_import_is_lazy(module):
+    total, loaded = import_ayo(module)
+
+    assert not loaded, f"importing {module} loaded {', '.join(loaded)}"
+    assert total < IMPORT_BUDGET, f"importing {module} took {total / 1000:.1f}ms"